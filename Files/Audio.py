@@ -0,0 +1,58 @@
+import array
+
+SAMPLE_RATE = 44100
+MIXER_BUFFER = 512 # Samples per mixer callback, ~12 ms at 44.1 kHz (pygame's default is several times larger)
+TONE_HZ = 440
+VOLUME = 0.2
+
+# Mixer sample size -> (array typecode, silence, full scale)
+SAMPLE_FORMATS = {
+    -8: ("b", 0, 127),
+    8: ("B", 128, 127),
+    -16: ("h", 0, 32767),
+    16: ("H", 32768, 32767),
+    32: ("f", 0.0, 1.0),
+}
+
+def init_mixer(buffer=MIXER_BUFFER, frequency=SAMPLE_RATE):
+    # Must run before pygame.init(), which opens the mixer with whatever was pre_init'd
+    import pygame
+    pygame.mixer.pre_init(frequency, -16, 1, buffer)
+
+def square_wave(frequency, size, channels, tone=TONE_HZ, volume=VOLUME):
+    # A whole number of periods (~100 ms) in the mixer's own format, so it loops without a seam
+    typecode, silence, scale = SAMPLE_FORMATS[size]
+    period = max(2, round(frequency / tone))
+    high = silence + scale * volume
+    low = silence - scale * volume
+    if typecode != "f": high, low = int(high), int(low)
+
+    wave = [high] * (period // 2) + [low] * (period - period // 2)
+    frames = wave * max(1, frequency // 10 // period)
+    return array.array(typecode, [sample for sample in frames for _ in range(channels)])
+
+class Beeper:
+    # The buzzer: one square wave buffer made up front, looping on a reserved channel. update() is called
+    # every frame but only touches the mixer when the sound timer starts or stops
+    def __init__(self, tone=TONE_HZ, volume=VOLUME):
+        import pygame
+        frequency, size, channels = pygame.mixer.get_init()
+        self.sound = pygame.mixer.Sound(buffer=square_wave(frequency, size, channels, tone, volume))
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+        self.started = False
+        self.playing = False
+
+    def update(self, active):
+        if active == self.playing: return
+        self.playing = active
+        if not active:
+            self.channel.pause()
+        elif self.started:
+            self.channel.unpause()
+        else:
+            self.channel.play(self.sound, loops=-1)
+            self.started = True
+
+    def stop(self):
+        self.update(False)
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import json
+import hashlib
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from Chip8_Emulator import QUIRKS
+from Chip8_Extended import core_for_rom
+from Scheduler import FrameScheduler
+from Profiler import Profiler
+
+ROM_EXTENSIONS = (".ch8", ".sc8", ".xo8")
+
+#--------HELPERS-----------#
+def find_roms(targets):
+    # Accepts ROM files and folders (scanned recursively, like the ROMS/ library)
+    roms = []
+    for target in targets:
+        if os.path.isdir(target):
+            for folder, subfolders, files in os.walk(target):
+                subfolders.sort()
+                roms += [os.path.join(folder, f) for f in sorted(files) if f.endswith(ROM_EXTENSIONS)]
+        else:
+            roms.append(target)
+    return roms
+
+def frame_hash(chip8_instance):
+    return hashlib.sha1(chip8_instance.framebuffer_bytes()).hexdigest()
+
+#--------HEADLESS RUN-----------#
+def run_rom(path, frames=600, cycles=None, ips=700, jit=False, profile=False, quirks=()):
+    # Runs one ROM with no display and no throttling. Frames get the same fractional instruction
+    # budget as Main.main (FrameScheduler), timers tick after every full frame
+    chip8 = core_for_rom(path)
+    chip8.jit_enabled = jit
+    chip8.set_quirks(quirks)
+    scheduler = FrameScheduler(ips)
+    profiler = Profiler(chip8) if profile else None # Interpreted while profiling, see Profiler
+
+    result = {"rom": path, "error": None}
+    executed = 0
+    frames_run = 0
+    start = time.perf_counter()
+    try:
+        chip8.load_rom(path)
+        while (executed < cycles) if cycles is not None else (frames_run < frames):
+            budget = scheduler.cycles_for_frame()
+            step = budget if cycles is None else min(budget, cycles - executed)
+            chip8.run(step)
+            executed += step
+            frames_run += 1
+            if step == budget: chip8.update_timers()
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+
+    # cycles is the emulated budget, cycles_per_sec only counts instructions actually executed (not idle skips)
+    result.update({
+        "cycles": executed,
+        "idle_cycles": chip8.idle_cycles,
+        "seconds": elapsed,
+        "cycles_per_sec": (executed - chip8.idle_cycles) / elapsed if elapsed > 0 else 0.0,
+        "frame_hash": frame_hash(chip8),
+        "pc": chip8.pc,
+        "i": chip8.i,
+        "v": chip8.v.hex(),
+        "stack": list(chip8.stack),
+        "delay_timer": chip8.delay_timer,
+        "sound_timer": chip8.sound_timer,
+    })
+    if profiler: result["profile"] = profiler.report()
+    return result
+
+def run_batch(roms, workers=None, **options):
+    # Results come back in the same order as roms. workers=1 runs in this process
+    job = partial(run_rom, **options)
+    if workers == 1:
+        return [job(path) for path in roms]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(job, roms))
+
+#--------CLI-----------#
+def print_report(results):
+    print(f"{'ROM':<40} {'cycles/s':>12}  {'frame hash':<12}  {'PC':<4}  V0-VF")
+    for res in results:
+        name = res["rom"]
+        if res["error"]:
+            print(f"{name:<40} ERROR {res['error']}")
+            continue
+        print(f"{name:<40} {res['cycles_per_sec']:>12,.0f}  {res['frame_hash'][:12]}  {res['pc']:03X}   {res['v'].upper()}")
+        if "profile" in res:
+            families = "  ".join(f"{op['family']} {op['share']:.0%}" for op in res["profile"]["opcodes"][:6])
+            hot = "  ".join(entry["pc"] for entry in res["profile"]["hot_pcs"][:4])
+            print(f"{'':<40} {families} | hot {hot}")
+
+    total_cycles = sum(res["cycles"] for res in results)
+    total_idle = sum(res["idle_cycles"] for res in results)
+    total_time = sum(res["seconds"] for res in results)
+    if total_time > 0:
+        print(f"\n{len(results)} ROMs, {total_cycles:,} cycles ({total_idle:,} idle skipped), "
+              f"{(total_cycles - total_idle) / total_time:,.0f} cycles/s per worker")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run CHIP-8 ROMs headless and report throughput and final state.")
+    parser.add_argument("targets", nargs="*", default=["ROMS"], help="ROM files or folders (default: ROMS)")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--frames", type=int, default=600, help="60 Hz frames to run per ROM (default: 600)")
+    limit.add_argument("--cycles", type=int, help="Instructions to run per ROM, instead of --frames")
+    parser.add_argument("--ips", type=int, default=700, help="Instructions per second used for timer ticks (default: 700)")
+    parser.add_argument("--jit", action="store_true", help="Use the block compiler")
+    parser.add_argument("--profile", action="store_true", help="Count opcode families and hot PCs per ROM (slower)")
+    parser.add_argument("--quirks", nargs="+", choices=list(QUIRKS), default=[], help="Compatibility quirks to turn on")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results to FILE as JSON")
+    args = parser.parse_args(argv)
+
+    roms = find_roms(args.targets)
+    if not roms:
+        print("No ROMs found")
+        return 1
+
+    results = run_batch(roms, workers=args.workers, frames=args.frames, cycles=args.cycles, ips=args.ips, jit=args.jit,
+                        profile=args.profile, quirks=args.quirks)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if any(res["error"] for res in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
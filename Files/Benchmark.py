@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+from Chip8_Emulator import Chip8
+from Chip8_Extended import Chip8Extended, core_for_rom
+from Scheduler import FrameScheduler
+from BatchRunner import find_roms
+
+CPU_FRAME_CYCLES = 10000 # Instructions per timed slice in the micro benchmarks
+SCALE = 12               # Same window scale as Main.py
+
+#--------MICRO ROMS-----------#
+# Each one is a tight loop of a single instruction class, assembled from 16-bit opcodes at 0x200
+MICRO_ROMS = {
+    "alu": [
+        0x6001, 0x6103,                                 # V0 = 1, V1 = 3
+        0x8014, 0x8015, 0x8012, 0x8011, 0x8013,         # 0x204: add, sub, and, or, xor
+        0x8016, 0x801E, 0x8017, 0x8010, 0x7001,         # shr, shl, subn, mov, V0 += 1
+        0x1204,
+    ],
+    "sprite": [
+        0x6200, 0xF229,                                 # I = font glyph 0
+        0xD015, 0x7003, 0x7101,                         # 0x204: draw 8x15 sprite, move it
+        0x1204,
+    ],
+    "memory": [
+        0xA300, 0xFF55, 0xA300, 0xFF65, 0x7001,         # Store and load all 16 registers
+        0x1200,
+    ],
+    "call": [
+        0x2206, 0x7001, 0x1200,                         # Call, then loop
+        0x00EE,                                         # 0x206: return
+    ],
+}
+
+def assemble(opcodes):
+    return b"".join(op.to_bytes(2, "big") for op in opcodes)
+
+#--------HELPERS-----------#
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(times, instructions=None):
+    # Per-frame seconds -> result entry. ips is the headline metric for CPU runs, fps for render runs
+    total = sum(times)
+    result = {
+        "frames": len(times),
+        "p50_ms": percentile(times, 0.50) * 1000,
+        "p95_ms": percentile(times, 0.95) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+    }
+    if instructions is not None: result["ips"] = instructions / total if total > 0 else 0.0
+    else: result["fps"] = len(times) / total if total > 0 else 0.0
+    return result
+
+def headline(result):
+    return ("ips", result["ips"]) if "ips" in result else ("fps", result["fps"])
+
+#--------CPU BENCHMARKS-----------#
+def bench_micro(name, frames=50, jit=False, warmup=5):
+    chip8 = Chip8()
+    chip8.jit_enabled = jit
+    rom = assemble(MICRO_ROMS[name])
+    chip8.memory[0x200:0x200 + len(rom)] = rom
+
+    for _ in range(warmup): chip8.run(CPU_FRAME_CYCLES)
+    times = []
+    idle = chip8.idle_cycles
+    for _ in range(frames):
+        start = time.perf_counter()
+        chip8.run(CPU_FRAME_CYCLES)
+        times.append(time.perf_counter() - start)
+    return summarize(times, frames * CPU_FRAME_CYCLES - (chip8.idle_cycles - idle))
+
+def bench_rom(path, frames=600, ips=700, jit=False):
+    # A real ROM at its normal frame budget, the same way Main.main steps it (no input)
+    chip8 = core_for_rom(path)
+    chip8.jit_enabled = jit
+    chip8.load_rom(path)
+    chip8.rng.seed(0)
+    scheduler = FrameScheduler(ips)
+
+    times = []
+    instructions = 0
+    for _ in range(frames):
+        cycles = scheduler.cycles_for_frame()
+        start = time.perf_counter()
+        chip8.run(cycles)
+        chip8.update_timers()
+        times.append(time.perf_counter() - start)
+        instructions += cycles
+    # Executed instructions only: idle loop skips advance cycle_count without running anything
+    return summarize(times, instructions - chip8.idle_cycles)
+
+#--------RENDER BENCHMARKS-----------#
+def render_step(name, chip8, frame):
+    # Changes the display for one frame of the named scenario, returns the FG colour to draw with
+    if name == "idle":
+        return (255, 255, 255)
+    if name in ("sprite", "crt"):
+        chip8.v[0] = (chip8.v[0] + 3) % 256
+        chip8.v[1] = (chip8.v[1] + 1) % 256
+        chip8.draw_sprite(0, 1, 15)
+        return (255, 255, 255)
+    if name == "full":
+        rng = random.Random(frame)
+        chip8.display = [rng.getrandbits(64) for _ in range(32)]
+        chip8.dirty_rows = (1 << 32) - 1
+        return (255, 255, 255)
+    if name == "rainbow":
+        return ((frame * 7) % 256, 255 - (frame * 3) % 256, 128)
+    if name == "hires-sprite": # 16x16 sprite on both planes
+        chip8.v[0] = (chip8.v[0] + 3) % 256
+        chip8.v[1] = (chip8.v[1] + 1) % 256
+        chip8.draw_sprite(0, 1, 0)
+        return (255, 255, 255)
+    if name == "hires-full":
+        rng = random.Random(frame)
+        chip8.planes = [[rng.getrandbits(128) for _ in range(64)] for _ in range(2)]
+        chip8.dirty_rows = chip8.all_rows
+        return (255, 255, 255)
+    raise ValueError(f"Unknown render scenario {name}")
+
+def bench_render(name, frames=300):
+    import pygame
+    surface = pygame.Surface((64 * SCALE, 32 * SCALE))
+    rng = random.Random(1)
+    if name.startswith("hires"): # 128x64 with both planes, same window size as the 64x32 runs
+        chip8 = Chip8Extended()
+        chip8.set_resolution(True)
+        chip8.plane_mask = 3
+        chip8.planes = [[rng.getrandbits(128) for _ in range(64)] for _ in range(2)]
+    else:
+        chip8 = Chip8()
+        chip8.display = [rng.getrandbits(64) for _ in range(32)] # Busy starting screen
+    scale = 64 * SCALE // chip8.width
+    crt = name == "crt"
+
+    chip8.draw(surface, scale, (0, 0, 0), (255, 255, 255), crt) # First draw sets everything up
+    times = []
+    for frame in range(frames):
+        fg = render_step(name, chip8, frame)
+        start = time.perf_counter()
+        chip8.draw(surface, scale, (0, 0, 0), fg, crt)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+#--------SUITE-----------#
+def run_suite(suites, roms=(), frames=None, ips=700):
+    results = {}
+    if "micro" in suites:
+        for name in MICRO_ROMS:
+            for jit in (False, True):
+                key = f"micro/{name}" + ("+jit" if jit else "")
+                results[key] = bench_micro(name, frames or 50, jit)
+                print_result(key, results[key])
+    if "macro" in suites:
+        for path in roms:
+            for jit in (False, True):
+                key = f"macro/{os.path.basename(path)}" + ("+jit" if jit else "")
+                try:
+                    results[key] = bench_rom(path, frames or 600, ips, jit)
+                    print_result(key, results[key])
+                except Exception as e:
+                    print(f"{key:<32} ERROR {type(e).__name__}: {e}")
+    if "render" in suites:
+        for name in ("idle", "sprite", "full", "crt", "rainbow", "hires-sprite", "hires-full"):
+            key = f"render/{name}"
+            results[key] = bench_render(name, frames or 300)
+            print_result(key, results[key])
+    return results
+
+def print_result(key, result):
+    metric, value = headline(result)
+    print(f"{key:<32} {value:>14,.0f} {metric}   p50 {result['p50_ms']:.3f} ms  "
+          f"p95 {result['p95_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms")
+
+def compare(results, baseline, threshold):
+    # Prints each benchmark against the baseline, returns the names that got slower by more than threshold
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>14} {'now':>14} {'change':>8}")
+    for key, result in results.items():
+        if key not in baseline: continue
+        metric, value = headline(result)
+        base = baseline[key].get(metric)
+        if not base: continue
+        change = value / base - 1
+        status = ""
+        if change < -threshold:
+            status = "REGRESSION"
+            regressions.append(key)
+        print(f"{key:<32} {base:>14,.0f} {value:>14,.0f} {change:>+8.1%} {status}")
+    return regressions
+
+#--------CLI-----------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CHIP-8 core and renderer, optionally against a saved baseline.")
+    parser.add_argument("roms", nargs="*", default=["ROMS"], help="ROM files or folders for the macro runs (default: ROMS)")
+    parser.add_argument("--suite", nargs="+", choices=("micro", "macro", "render"), default=["micro", "macro", "render"])
+    parser.add_argument("--frames", type=int, help="Timed frames per benchmark (default: 50 micro, 600 macro, 300 render)")
+    parser.add_argument("--ips", type=int, default=700, help="Instructions per second for the macro runs (default: 700)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against a baseline written with --save")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before failing (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    roms = [path for path in find_roms(args.roms) if os.path.exists(path)] if "macro" in args.suite else []
+    results = run_suite(args.suite, roms, args.frames, args.ips)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+from Chip8_Emulator import QUIRKS, opcode_key, quiet_loop
+
+MAX_BLOCK_LENGTH = 64 # Instructions per compiled block before we force an exit
+
+#--------CODE TEMPLATES-----------#
+# Straight-line instructions: emitted inline, execution falls through to the next one
+INLINE = {
+    0x00E0: ["c._op_00e0()"],
+    0x6000: ["v[{x}] = {nn}"],
+    0x7000: ["v[{x}] = (v[{x}] + {nn}) & 0xFF"],
+    0x8000: ["v[{x}] = v[{y}]"],
+    0x8001: ["v[{x}] |= v[{y}]"],
+    0x8002: ["v[{x}] &= v[{y}]"],
+    0x8003: ["v[{x}] ^= v[{y}]"],
+    0x8004: ["total = v[{x}] + v[{y}]",
+             "v[15] = 1 if total > 255 else 0",
+             "v[{x}] = total & 0xFF"],
+    0x8005: ["v[15] = 1 if v[{x}] >= v[{y}] else 0",
+             "v[{x}] = (v[{x}] - v[{y}]) & 0xFF"],
+    0x8006: ["v[15] = v[{x}] & 0x1",
+             "v[{x}] >>= 1"],
+    0x8007: ["v[15] = 1 if v[{y}] >= v[{x}] else 0",
+             "v[{x}] = (v[{y}] - v[{x}]) & 0xFF"],
+    0x800E: ["v[15] = (v[{x}] & 0x80) >> 7",
+             "v[{x}] = (v[{x}] << 1) & 0xFF"],
+    0xA000: ["c.i = {nnn}"],
+    0xC000: ["v[{x}] = c.rng.randint(0, 255) & {nn}",
+             "c.idle_loop = None"],
+    0xD000: ["c.draw_sprite({x}, {y}, {n})"],
+    0xF007: ["v[{x}] = c.delay_timer"],
+    0xF015: ["c.delay_timer = v[{x}]"],
+    0xF018: ["c.sound_timer = v[{x}]"],
+    0xF01E: ["c.i = (c.i + v[{x}]) & 0xFFF"],
+    0xF029: ["c.i = v[{x}] * 5"],
+    0xF065: ["c._op_fx65({x})"],
+}
+
+# Control flow and code-writing instructions: always the last instruction of a block.
+# {next} is the fall-through address, {skip} the address after a taken skip
+EXIT = {
+    0x00EE: ["c.pc = c.stack.pop()"],
+    0x1000: ["c.pc = {nnn}"],
+    0x2000: ["c.stack.append({next})",
+             "c.pc = {nnn}"],
+    0x3000: ["c.pc = {skip} if v[{x}] == {nn} else {next}"],
+    0x4000: ["c.pc = {skip} if v[{x}] != {nn} else {next}"],
+    0x5000: ["c.pc = {skip} if v[{x}] == v[{y}] else {next}"],
+    0x9000: ["c.pc = {skip} if v[{x}] != v[{y}] else {next}"],
+    0xB000: ["c.pc = {nnn} + v[0]"],
+    0xE09E: ["c.pc = {skip} if c.keypad[v[{x}]] else {next}"],
+    0xE0A1: ["c.pc = {skip} if not c.keypad[v[{x}]] else {next}"],
+    # FX33/FX55 may overwrite code, so the block ends and the next one is looked up fresh
+    0xF033: ["c.pc = {next}",
+             "c._op_fx33({x})"],
+    0xF055: ["c.pc = {next}",
+             "c._op_fx55({x})"],
+    0xF00A: ["c.pc = {next}",
+             "c._op_fx0a({x})"],
+}
+
+# Quirk handlers (see Chip8_Emulator.QUIRKS) by name, used instead of the template for their opcode.
+# They end a block whenever the opcode they replace does
+VARIANTS = {
+    "_op_8xy1_vf": ["v[{x}] |= v[{y}]",
+                    "v[15] = 0"],
+    "_op_8xy2_vf": ["v[{x}] &= v[{y}]",
+                    "v[15] = 0"],
+    "_op_8xy3_vf": ["v[{x}] ^= v[{y}]",
+                    "v[15] = 0"],
+    "_op_8xy6_vy": ["value = v[{y}]",
+                    "v[15] = value & 0x1",
+                    "v[{x}] = value >> 1"],
+    "_op_8xye_vy": ["value = v[{y}]",
+                    "v[15] = (value & 0x80) >> 7",
+                    "v[{x}] = (value << 1) & 0xFF"],
+    "_op_bxnn": ["c.pc = {nnn} + v[{x}]"],
+    "draw_sprite_clipped": ["c.draw_sprite({x}, {y}, {n}, False)"],
+    "_op_fx55_i": ["c.pc = {next}",
+                   "c._op_fx55_i({x})"],
+    "_op_fx65_i": ["c._op_fx65_i({x})"],
+}
+
+# A backward (or self) jump closing a loop that may only be waiting (see Chip8.decode_at and check_idle)
+BACKWARD_JUMP = ["c.pc = {nnn}",
+                 "c.check_idle()"]
+
+#--------COMPILER-----------#
+def compile_block(chip8, start):
+    # Returns (function, instruction count, size in bytes), or None if there is no code at start
+    memory = chip8.memory
+    variants = {key: VARIANTS[name] for quirk in chip8.quirks for key, (name, fields) in QUIRKS[quirk].items()}
+    lines = []
+    addr = start
+    length = 0
+    exited = False
+
+    while length < MAX_BLOCK_LENGTH and addr + 1 < len(memory):
+        opcode = (memory[addr] << 8) | memory[addr + 1]
+        key = opcode_key(opcode)
+        fields = {
+            "x": (opcode & 0x0F00) >> 8,
+            "y": (opcode & 0x00F0) >> 4,
+            "n": (opcode & 0x000F),
+            "nn": (opcode & 0x00FF),
+            "nnn": (opcode & 0x0FFF),
+            "next": addr + 2,
+            "skip": addr + 4,
+        }
+        addr += 2
+        length += 1
+
+        if key in EXIT:
+            loop = key == 0x1000 and quiet_loop(memory, fields["nnn"], addr - 2)
+            template = BACKWARD_JUMP if loop else variants.get(key, EXIT[key])
+            lines += [line.format(**fields) for line in template]
+            exited = True
+            break
+        lines += [line.format(**fields) for line in variants.get(key, INLINE.get(key, ()))]
+
+    if length == 0:
+        return None
+    if not exited:
+        lines.append(f"c.pc = {addr}")
+
+    source = "def block(c):\n    v = c.v\n" + "".join(f"    {line}\n" for line in lines)
+    namespace = {}
+    exec(compile(source, f"<chip8 block 0x{start:03X}>", "exec"), namespace)
+    return namespace["block"], length, addr - start
@@ -0,0 +1,259 @@
+import os
+import sys
+import queue
+import struct
+import argparse
+import threading
+
+from Chip8_Extended import Chip8Extended, core_for_rom
+from Scheduler import FrameScheduler
+from Movie import replay_movie
+
+CAPTURE_QUEUE = 256  # Changed frames waiting for the writer, past this new changes are dropped (the game never waits)
+FRAME_RATE = 60
+GIF_MIN_DELAY = 2    # Centiseconds. Viewers slow anything shorter down to 10, so faster changes are merged
+RAW_EXTENSION = ".rgb"
+DEFAULT_COLOURS = ("#0a140a", "#00ff00") # Background, foreground (the Default profile's)
+
+# Packed display byte -> its 8 pixels as 0/1 bytes, and doubled (16 bytes) for lores frames on a hires canvas
+EXPANDED = {scale: [bytes(byte >> (7 - k) & 1 for k in range(8) for _ in range(scale)) for byte in range(256)]
+            for scale in (1, 2)}
+
+def centiseconds(frame):
+    return frame * 100 // FRAME_RATE
+
+#--------GIF-----------#
+def lzw_encode(pixels, min_size):
+    # GIF flavoured LZW: variable width codes packed LSB first, table reset with a clear code when full
+    clear = 1 << min_size
+    out = bytearray()
+    acc = 0
+    bits = 0
+    size = min_size + 1
+    table = {}
+    next_code = clear + 2
+
+    acc |= clear << bits
+    bits += size
+    prefix = pixels[0]
+    for pixel in pixels[1:]:
+        key = prefix << 8 | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+
+        acc |= prefix << bits
+        bits += size
+        while bits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            bits -= 8
+
+        if next_code < 4095:
+            if next_code == 1 << size: size += 1
+            table[key] = next_code
+            next_code += 1
+        else:
+            acc |= clear << bits
+            bits += size
+            table.clear()
+            next_code = clear + 2
+            size = min_size + 1
+        prefix = pixel
+
+    for code in (prefix, clear + 1): # Last string, end of information
+        acc |= code << bits
+        bits += size
+        if next_code == 1 << size and size < 12: size += 1 # The decoder already added an entry for prefix
+    while bits > 0:
+        out.append(acc & 0xFF)
+        acc >>= 8
+        bits -= 8
+    return bytes(out)
+
+class GifWriter:
+    # Animated GIF written as frames arrive. A frame only covers the band of rows that changed since the
+    # last one written, and its delay is only known once the next frame starts, so one is always held back
+    def __init__(self, f, width, height, palette):
+        self.f = f
+        self.width = width
+        self.height = height
+        self.bits = max(1, (len(palette) - 1).bit_length())
+        table = b"".join(bytes(colour) for colour in palette).ljust(3 << self.bits, b"\0")
+        f.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80 | (self.bits - 1) << 4 | (self.bits - 1), 0, 0))
+        f.write(table)
+        f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00") # Loop forever
+        self.canvas = None # Pixels as of the last frame written
+        self.held = None   # (start frame, pixels) waiting for its delay
+
+    def add(self, start, pixels):
+        if self.held:
+            held_start, held_pixels = self.held
+            delay = centiseconds(start) - centiseconds(held_start)
+            if delay < GIF_MIN_DELAY:
+                self.held = (held_start, pixels) # Too short to be seen, the newer frame takes its time
+                return
+            self.write(held_pixels, delay)
+        self.held = (start, pixels)
+
+    def close(self, end):
+        if self.held:
+            start, pixels = self.held
+            self.write(pixels, max(1, centiseconds(end) - centiseconds(start)))
+        self.f.write(b"\x3b")
+
+    def write(self, pixels, delay):
+        width = self.width
+        canvas = self.canvas
+        top, bottom = 0, self.height
+        if canvas is not None:
+            changed = [y for y in range(self.height) if pixels[y * width:(y + 1) * width] != canvas[y * width:(y + 1) * width]]
+            top, bottom = (changed[0], changed[-1] + 1) if changed else (0, 1) # Unchanged, one row just to carry the delay
+        self.canvas = pixels
+
+        min_size = max(2, self.bits)
+        data = lzw_encode(pixels[top * width:bottom * width], min_size)
+        f = self.f
+        f.write(b"\x21\xf9\x04\x04" + struct.pack("<H", delay) + b"\x00\x00") # Leave in place, no transparency
+        f.write(b"\x2c" + struct.pack("<HHHHB", 0, top, width, bottom - top, 0) + bytes((min_size,)))
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            f.write(bytes((len(block),)) + block)
+        f.write(b"\x00")
+
+#--------RAW VIDEO-----------#
+class RawWriter:
+    # Headerless rgb24 at 60 fps, every frame written out (a collapsed one once per frame it lasted). Convert with
+    # ffmpeg -f rawvideo -pixel_format rgb24 -video_size WxH -framerate 60 -i capture.rgb capture.mp4
+    def __init__(self, f, width, height, palette):
+        self.f = f
+        self.colours = [bytes(colour) for colour in palette]
+        self.held = None
+
+    def add(self, start, pixels):
+        if self.held: self.write(self.held[1], start - self.held[0])
+        self.held = (start, pixels)
+
+    def close(self, end):
+        if self.held: self.write(self.held[1], max(1, end - self.held[0]))
+
+    def write(self, pixels, frames):
+        self.f.write(b"".join(map(self.colours.__getitem__, pixels)) * frames)
+
+#--------CAPTURE-----------#
+class Capture:
+    # Records the display to an animated GIF (or raw video for .rgb paths) without slowing the game: add() runs
+    # once per emulated frame and only compares the packed framebuffer with the last one, changed frames go
+    # through a bounded queue to a writer thread that applies the palette and encodes. Unchanged frames just
+    # make the previous one last longer. Extended cores record at 128x64, lores frames doubled.
+    # realtime=False (headless runs, nothing to keep up with) waits for the writer instead of dropping
+    def __init__(self, path, chip8_instance, bg_color, fg_color, realtime=True, queue_size=CAPTURE_QUEUE):
+        extended = isinstance(chip8_instance, Chip8Extended)
+        self.path = path
+        self.width, self.height = (128, 64) if extended else (64, 32)
+        self.planes = 2 if extended else 1
+        palette = [tuple(round(bg + (fg - bg) * shade) for bg, fg in zip(bg_color, fg_color))
+                   for shade in chip8_instance.PIXEL_SHADES]
+
+        self.file = open(path, "wb")
+        writer = RawWriter if path.endswith(RAW_EXTENSION) else GifWriter
+        self.writer = writer(self.file, self.width, self.height, palette)
+        self.queue = queue.Queue(queue_size)
+        self.realtime = realtime
+        self.frame = 0    # Frames added so far
+        self.last = None  # Framebuffer as last queued
+        self.dropped = 0  # Changes skipped while the queue was full
+        self.thread = threading.Thread(target=self.drain, name="capture-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, chip8_instance):
+        data = chip8_instance.framebuffer_bytes()
+        if data != self.last:
+            try:
+                self.queue.put((self.frame, data), block=not self.realtime)
+                self.last = data
+            except queue.Full:
+                self.dropped += 1
+        self.frame += 1
+
+    def drain(self):
+        while True:
+            item = self.queue.get()
+            if item is None: return
+            start, data = item
+            self.writer.add(start, self.pixels(data))
+
+    def pixels(self, data):
+        # Packed framebuffer -> one palette index per canvas pixel (plane 1 bit | plane 2 bit << 1)
+        plane_size = len(data) // self.planes
+        scale = 1 if plane_size * 8 == self.width * self.height else 2
+        expand = EXPANDED[scale]
+        row_size = self.width // 8 // scale
+        value = 0
+        for plane in range(self.planes):
+            rows = []
+            for start in range(plane * plane_size, (plane + 1) * plane_size, row_size):
+                rows.append(b"".join([expand[byte] for byte in data[start:start + row_size]]) * scale)
+            value += int.from_bytes(b"".join(rows), "big") << plane # 0/1 bytes, no carries between pixels
+        return value.to_bytes(self.width * self.height, "big")
+
+    def stop(self):
+        # Waits for the writer to finish the queue, returns the path written
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close(self.frame)
+        self.file.close()
+        if self.dropped: print(f"Capture dropped {self.dropped} frame changes (writer fell behind)")
+        return self.path
+
+#--------HEADLESS-----------#
+def capture_rom(path, out, colours=DEFAULT_COLOURS, frames=600, ips=700):
+    # Runs the ROM with no input, like BatchRunner, recording every frame. A ROM that crashes is recorded up to there
+    chip8 = core_for_rom(path)
+    chip8.load_rom(path)
+    scheduler = FrameScheduler(ips)
+    capture = Capture(out, chip8, *map(hex_to_rgb, colours), realtime=False)
+    try:
+        for _ in range(frames):
+            scheduler.run_frame(chip8)
+            capture.add(chip8)
+    except Exception as e:
+        print(f"{path} stopped after {capture.frame} frames: {type(e).__name__}: {e}")
+    return capture.stop()
+
+def capture_movie(path, out, colours=DEFAULT_COLOURS):
+    # Replays a Ctrl + M recording (see Movie.py) with its input, recording every frame
+    captures = []
+    def on_frame(chip8):
+        if not captures: captures.append(Capture(out, chip8, *map(hex_to_rgb, colours), realtime=False))
+        captures[0].add(chip8)
+    replay_movie(path, on_frame=on_frame)
+    return captures[0].stop() if captures else None
+
+def hex_to_rgb(hex_col):
+    hex_col = hex_col.lstrip('#')
+    return tuple(int(hex_col[i:i+2], 16) for i in (0, 2, 4))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record CHIP-8 ROMs or input movies headless to animated GIF or raw video.")
+    parser.add_argument("source", help="ROM file (run with no input) or .c8m movie (replayed)")
+    parser.add_argument("output", help=f"Output file, .gif or {RAW_EXTENSION} (rgb24 at 60 fps)")
+    parser.add_argument("--frames", type=int, default=600, help="60 Hz frames to record from a ROM (default: 600)")
+    parser.add_argument("--ips", type=int, default=700, help="Instructions per second for a ROM (default: 700)")
+    parser.add_argument("--bg", default=DEFAULT_COLOURS[0], help=f"Background colour (default: {DEFAULT_COLOURS[0]})")
+    parser.add_argument("--fg", default=DEFAULT_COLOURS[1], help=f"Foreground colour (default: {DEFAULT_COLOURS[1]})")
+    args = parser.parse_args(argv)
+
+    if os.path.splitext(args.source)[1] == ".c8m":
+        path = capture_movie(args.source, args.output, (args.bg, args.fg))
+    else:
+        path = capture_rom(args.source, args.output, (args.bg, args.fg), args.frames, args.ips)
+    if not path:
+        print("Nothing to record")
+        return 1
+    print(f"Capture saved to {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import random
+import hashlib
+
+import numpy as np
+
+from Chip8_Emulator import Chip8, OPCODE_TABLE, opcode_key
+
+U64 = np.uint64
+SPRITE_SHIFT = U64(56)
+
+# Opcode -> index into HANDLER_KEYS (-1 = unknown, a no-op), one gather per step instead of opcode_key per machine
+HANDLER_KEYS = list(OPCODE_TABLE)
+_key_ids = {key: index for index, key in enumerate(HANDLER_KEYS)}
+HANDLER_IDS = np.array([_key_ids.get(opcode_key(op), -1) for op in range(0x10000)], dtype=np.int16)
+
+OPERAND_FIELDS = {
+    "x": lambda opcode: (opcode >> 8) & 0xF,
+    "y": lambda opcode: (opcode >> 4) & 0xF,
+    "n": lambda opcode: opcode & 0xF,
+    "nn": lambda opcode: opcode & 0xFF,
+    "nnn": lambda opcode: opcode & 0xFFF,
+}
+
+class Chip8Batch:
+    # N CHIP-8 machines in lockstep, every field is one NumPy array with a leading machine axis.
+    # step() fetches all N opcodes at once, groups the machines by instruction (the same OPCODE_TABLE keys
+    # Chip8 dispatches on) and runs each group's handler once over its machines. Every machine behaves
+    # exactly like its own Chip8; a machine that hits an error Chip8 would raise on is halted and the
+    # exception name kept in errors[m]
+    def __init__(self, n):
+        self.n = n
+        self.memory = np.tile(np.frombuffer(bytes(Chip8().memory), dtype=np.uint8), (n, 1)) # Font included
+        self.v = np.zeros((n, 16), dtype=np.uint8)
+        self.i = np.zeros(n, dtype=np.int64)
+        self.pc = np.full(n, 0x200, dtype=np.int64)
+        self.stack = np.zeros((n, 16), dtype=np.int64) # Grows (see _op_2nnn), Chip8's stack is unbounded
+        self.sp = np.zeros(n, dtype=np.int64)
+        self.delay_timer = np.zeros(n, dtype=np.int64)
+        self.sound_timer = np.zeros(n, dtype=np.int64)
+        self.keypad = np.zeros((n, 16), dtype=np.uint8)
+        self.display = np.zeros((n, 32), dtype=np.uint64) # One 64-bit row per int, bit 63 = column 0, as Chip8
+        self.cycle_count = np.zeros(n, dtype=np.int64)
+
+        self.rngs = [random.Random() for _ in range(n)] # CXNN, one seedable RNG per machine
+        self.running = np.ones(n, dtype=bool)
+        self.all_machines = np.arange(n)
+        self.errors = [None] * n
+        self.rom_hash = [""] * n
+
+        # HANDLER_IDS index -> bound batch handler (same names as Chip8's) and its operand fields
+        self.handlers = [(getattr(self, OPCODE_TABLE[key][0]), [OPERAND_FIELDS[f] for f in OPCODE_TABLE[key][1]])
+                         for key in HANDLER_KEYS]
+
+    #--------LOADING-----------#
+    def load_rom(self, path, machines=None):
+        # Same ROM into every machine, or only into the given machine indices
+        with open(path, "rb") as f:
+            rom_data = f.read()
+        self.load_program(rom_data, machines)
+
+    def load_program(self, rom_data, machines=None):
+        machines = np.arange(self.n) if machines is None else np.asarray(machines)
+        self.memory[machines, 0x200:0x200 + len(rom_data)] = np.frombuffer(rom_data, dtype=np.uint8)
+        rom_hash = hashlib.sha1(rom_data).hexdigest()
+        for m in machines: self.rom_hash[m] = rom_hash
+
+    def seed(self, seeds):
+        for rng, seed in zip(self.rngs, seeds): rng.seed(seed)
+
+    def set_key(self, machine, key, pressed):
+        self.keypad[machine, key] = 1 if pressed else 0
+
+    #--------STATE EXCHANGE-----------#
+    def to_chip8(self, m):
+        # Machine m as a standalone Chip8 (to draw it, snapshot it, or keep playing it interactively)
+        chip8 = Chip8()
+        chip8.memory = bytearray(self.memory[m].tobytes())
+        chip8.clear_code_caches()
+        chip8.v = bytearray(self.v[m].tobytes())
+        chip8.i = int(self.i[m])
+        chip8.pc = int(self.pc[m])
+        chip8.stack = [int(addr) for addr in self.stack[m, :self.sp[m]]]
+        chip8.delay_timer = int(self.delay_timer[m])
+        chip8.sound_timer = int(self.sound_timer[m])
+        chip8.keypad = [int(key) for key in self.keypad[m]]
+        chip8.display = [int(row) for row in self.display[m]]
+        chip8.cycle_count = int(self.cycle_count[m])
+        chip8.rng.setstate(self.rngs[m].getstate())
+        chip8.rom_hash = self.rom_hash[m]
+        return chip8
+
+    def framebuffer_bytes(self, m):
+        # Same packed 256 bytes as Chip8.framebuffer_bytes
+        return self.display[m].astype(">u8").tobytes()
+
+    #--------EXECUTION-----------#
+    def halt(self, machines, error):
+        for m in machines:
+            self.running[m] = False
+            self.errors[m] = error
+
+    def update_timers(self):
+        np.maximum(self.delay_timer - 1, 0, out=self.delay_timer)
+        np.maximum(self.sound_timer - 1, 0, out=self.sound_timer)
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            if not self.step(): return
+
+    def step(self):
+        # One instruction on every running machine, returns False once none are left
+        machines = self.all_machines if self.running.all() else np.flatnonzero(self.running)
+        if not len(machines): return False
+
+        pc = self.pc[machines]
+        bad = pc > 4094 # Chip8 raises IndexError reading memory[pc + 1]
+        if bad.any():
+            self.halt(machines[bad], "IndexError")
+            machines, pc = machines[~bad], pc[~bad]
+            if not machines.size: return bool(self.running.any())
+
+        memory = self.memory
+        opcode = (memory[machines, pc].astype(np.int64) << 8) | memory[machines, pc + 1]
+        self.pc[machines] = pc + 2
+        self.cycle_count[machines] += 1
+
+        # Group machines by handler. Machines running the same ROM are usually all on one instruction,
+        # otherwise sort once and split where the handler changes
+        ids = HANDLER_IDS[opcode]
+        if (ids == ids[0]).all():
+            groups = [(int(ids[0]), slice(None))]
+        else:
+            order = np.argsort(ids, kind="stable")
+            ordered = ids[order]
+            starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+            ends = np.append(starts[1:], len(order))
+            groups = [(int(ordered[start]), order[start:end]) for start, end in zip(starts, ends)]
+
+        for handler_id, group in groups:
+            if handler_id < 0: continue # Unknown opcode, a no-op as in Chip8
+            handler, fields = self.handlers[handler_id]
+            group_opcodes = opcode[group]
+            handler(machines[group], *(field(group_opcodes) for field in fields))
+        return True
+
+    #--------INSTRUCTIONS-----------#
+    # Each takes the machine indices of its group plus one array per operand field.
+    # Flag ops re-read V after writing VF, like Chip8 does, so x/y = F behaves the same
+    def _op_00e0(self, m): self.display[m] = 0
+
+    def _op_00ee(self, m):
+        empty = self.sp[m] == 0 # pop from empty list
+        if empty.any():
+            self.halt(m[empty], "IndexError")
+            m = m[~empty]
+        self.sp[m] -= 1
+        self.pc[m] = self.stack[m, self.sp[m]]
+
+    def _op_1nnn(self, m, nnn): self.pc[m] = nnn
+
+    def _op_2nnn(self, m, nnn):
+        if self.sp[m].max() >= self.stack.shape[1]:
+            self.stack = np.concatenate((self.stack, np.zeros_like(self.stack)), axis=1)
+        self.stack[m, self.sp[m]] = self.pc[m]
+        self.sp[m] += 1
+        self.pc[m] = nnn
+
+    def _op_3xnn(self, m, x, nn): self.pc[m] += 2 * (self.v[m, x] == nn)
+    def _op_4xnn(self, m, x, nn): self.pc[m] += 2 * (self.v[m, x] != nn)
+    def _op_5xy0(self, m, x, y): self.pc[m] += 2 * (self.v[m, x] == self.v[m, y])
+    def _op_9xy0(self, m, x, y): self.pc[m] += 2 * (self.v[m, x] != self.v[m, y])
+
+    def _op_6xnn(self, m, x, nn): self.v[m, x] = nn
+    def _op_7xnn(self, m, x, nn): self.v[m, x] = (self.v[m, x] + nn) & 0xFF
+    def _op_8xy0(self, m, x, y): self.v[m, x] = self.v[m, y]
+    def _op_8xy1(self, m, x, y): self.v[m, x] |= self.v[m, y]
+    def _op_8xy2(self, m, x, y): self.v[m, x] &= self.v[m, y]
+    def _op_8xy3(self, m, x, y): self.v[m, x] ^= self.v[m, y]
+
+    def _op_8xy4(self, m, x, y):
+        total = self.v[m, x].astype(np.int64) + self.v[m, y]
+        self.v[m, 0xF] = total > 255
+        self.v[m, x] = total & 0xFF
+
+    def _op_8xy5(self, m, x, y):
+        self.v[m, 0xF] = self.v[m, x] >= self.v[m, y]
+        self.v[m, x] = (self.v[m, x].astype(np.int64) - self.v[m, y]) & 0xFF
+
+    def _op_8xy6(self, m, x, y):
+        self.v[m, 0xF] = self.v[m, x] & 0x1
+        self.v[m, x] = self.v[m, x] >> 1
+
+    def _op_8xy7(self, m, x, y):
+        self.v[m, 0xF] = self.v[m, y] >= self.v[m, x]
+        self.v[m, x] = (self.v[m, y].astype(np.int64) - self.v[m, x]) & 0xFF
+
+    def _op_8xye(self, m, x, y):
+        self.v[m, 0xF] = (self.v[m, x] & 0x80) >> 7
+        self.v[m, x] = (self.v[m, x].astype(np.int64) << 1) & 0xFF
+
+    def _op_annn(self, m, nnn): self.i[m] = nnn
+    def _op_bnnn(self, m, nnn): self.pc[m] = nnn + self.v[m, 0]
+
+    def _op_cxnn(self, m, x, nn):
+        rngs = self.rngs
+        self.v[m, x] = np.array([rngs[machine].randint(0, 255) for machine in m], dtype=np.int64) & nn
+
+    def draw_sprite(self, m, x_reg, y_reg, height):
+        x_start = (self.v[m, x_reg] % 64).astype(np.uint64)
+        y_start = self.v[m, y_reg].astype(np.int64) % 32
+        self.v[m, 0xF] = 0
+        i = self.i[m]
+
+        for row in range(int(height.max()) if len(height) else 0):
+            rows = row < height
+            if not rows.all():
+                m, x_start, y_start, i, height = m[rows], x_start[rows], y_start[rows], i[rows], height[rows]
+            out_of_range = i + row > 4095 # Chip8 raises on memory[i + row], after drawing the rows before it
+            if out_of_range.any():
+                self.halt(m[out_of_range], "IndexError")
+                keep = ~out_of_range
+                m, x_start, y_start, i, height = m[keep], x_start[keep], y_start[keep], i[keep], height[keep]
+
+            # Rotate the byte right by x_start within 64 bits so columns wrap, as in Chip8.draw_sprite
+            sprite_bits = self.memory[m, i + row].astype(np.uint64) << SPRITE_SHIFT
+            wrapped = np.where(x_start == 0, U64(0), sprite_bits << ((U64(64) - x_start) % U64(64)))
+            sprite_bits = (sprite_bits >> x_start) | wrapped
+            y_pos = (y_start + row) % 32
+
+            current = self.display[m, y_pos]
+            hit = (current & sprite_bits) != 0
+            self.v[m[hit], 0xF] = 1
+            self.display[m, y_pos] = current ^ sprite_bits
+
+    def _op_ex9e(self, m, x):
+        key = self.v[m, x].astype(np.int64)
+        bad = key > 15 # keypad index out of range
+        if bad.any():
+            self.halt(m[bad], "IndexError")
+            m, key = m[~bad], key[~bad]
+        self.pc[m] += 2 * (self.keypad[m, key] != 0)
+
+    def _op_exa1(self, m, x):
+        key = self.v[m, x].astype(np.int64)
+        bad = key > 15
+        if bad.any():
+            self.halt(m[bad], "IndexError")
+            m, key = m[~bad], key[~bad]
+        self.pc[m] += 2 * (self.keypad[m, key] == 0)
+
+    def _op_fx07(self, m, x): self.v[m, x] = self.delay_timer[m]
+    def _op_fx15(self, m, x): self.delay_timer[m] = self.v[m, x]
+    def _op_fx18(self, m, x): self.sound_timer[m] = self.v[m, x]
+    def _op_fx1e(self, m, x): self.i[m] = (self.i[m] + self.v[m, x]) & 0xFFF
+    def _op_fx29(self, m, x): self.i[m] = self.v[m, x].astype(np.int64) * 5
+
+    def _op_fx33(self, m, x):
+        bad = self.i[m] + 2 > 4095
+        if bad.any():
+            self.halt(m[bad], "IndexError")
+            m, x = m[~bad], x[~bad]
+        value = self.v[m, x]
+        i = self.i[m]
+        self.memory[m, i] = value // 100
+        self.memory[m, i + 1] = (value // 10) % 10
+        self.memory[m, i + 2] = value % 10
+
+    def _op_fx55(self, m, x):
+        bad = self.i[m] + x > 4095
+        if bad.any():
+            self.halt(m[bad], "IndexError")
+            m, x = m[~bad], x[~bad]
+        for reg in range(16):
+            m, x = m[reg <= x], x[reg <= x]
+            if not len(m): break
+            self.memory[m, self.i[m] + reg] = self.v[m, reg]
+
+    def _op_fx65(self, m, x):
+        bad = self.i[m] + x > 4095
+        if bad.any():
+            self.halt(m[bad], "IndexError")
+            m, x = m[~bad], x[~bad]
+        for reg in range(16):
+            m, x = m[reg <= x], x[reg <= x]
+            if not len(m): break
+            self.v[m, reg] = self.memory[m, self.i[m] + reg]
+
+    def _op_fx0a(self, m, x):
+        keys = self.keypad[m]
+        pressed = keys.any(axis=1)
+        self.v[m[pressed], x[pressed]] = keys[pressed].argmax(axis=1)
+        self.pc[m[~pressed]] -= 2
@@ -1,11 +1,156 @@
-import pygame
 import random
-import copy
+import struct
+import hashlib
+
+# pygame and NumPy are only needed to draw, so they load on the first draw (load_render_modules)
+# and the library screen and headless tools (BatchRunner, Movie) start without paying for them
+pygame = None
+np = None
+render_modules_loaded = False
+
+#--------OPCODE TABLE-----------#
+# Lookup key -> (handler name, operand fields). 0x8 is keyed on n, 0xE/0xF on nn
+OPCODE_TABLE = {
+    0x00E0: ("_op_00e0", ()),
+    0x00EE: ("_op_00ee", ()),
+    0x1000: ("_op_1nnn", ("nnn",)),
+    0x2000: ("_op_2nnn", ("nnn",)),
+    0x3000: ("_op_3xnn", ("x", "nn")),
+    0x4000: ("_op_4xnn", ("x", "nn")),
+    0x5000: ("_op_5xy0", ("x", "y")),
+    0x6000: ("_op_6xnn", ("x", "nn")),
+    0x7000: ("_op_7xnn", ("x", "nn")),
+    0x8000: ("_op_8xy0", ("x", "y")),
+    0x8001: ("_op_8xy1", ("x", "y")),
+    0x8002: ("_op_8xy2", ("x", "y")),
+    0x8003: ("_op_8xy3", ("x", "y")),
+    0x8004: ("_op_8xy4", ("x", "y")),
+    0x8005: ("_op_8xy5", ("x", "y")),
+    0x8006: ("_op_8xy6", ("x", "y")),
+    0x8007: ("_op_8xy7", ("x", "y")),
+    0x800E: ("_op_8xye", ("x", "y")),
+    0x9000: ("_op_9xy0", ("x", "y")),
+    0xA000: ("_op_annn", ("nnn",)),
+    0xB000: ("_op_bnnn", ("nnn",)),
+    0xC000: ("_op_cxnn", ("x", "nn")),
+    0xD000: ("draw_sprite", ("x", "y", "n")),
+    0xE09E: ("_op_ex9e", ("x",)),
+    0xE0A1: ("_op_exa1", ("x",)),
+    0xF007: ("_op_fx07", ("x",)),
+    0xF00A: ("_op_fx0a", ("x",)),
+    0xF015: ("_op_fx15", ("x",)),
+    0xF018: ("_op_fx18", ("x",)),
+    0xF01E: ("_op_fx1e", ("x",)),
+    0xF029: ("_op_fx29", ("x",)),
+    0xF033: ("_op_fx33", ("x",)),
+    0xF055: ("_op_fx55", ("x",)),
+    0xF065: ("_op_fx65", ("x",)),
+}
+
+# Compatibility quirks: name -> the table entries it swaps in. All off is the behaviour above (8XY6/8XYE
+# shift VX, FX55/FX65 leave I alone, BNNN adds V0, sprites wrap, logic ops keep VF). The handler for each
+# instruction is picked when it's decoded, so a quirk costs nothing per instruction (see set_quirks)
+QUIRKS = {
+    "shift": {0x8006: ("_op_8xy6_vy", ("x", "y")), 0x800E: ("_op_8xye_vy", ("x", "y"))}, # Shift VY into VX (COSMAC)
+    "memory": {0xF055: ("_op_fx55_i", ("x",)), 0xF065: ("_op_fx65_i", ("x",))},           # FX55/FX65 advance I (COSMAC)
+    "jump": {0xB000: ("_op_bxnn", ("x", "nnn"))},                                         # BXNN jumps to XNN + VX (SUPER-CHIP)
+    "clip": {0xD000: ("draw_sprite_clipped", ("x", "y", "n"))},                           # Sprites clip at the edges
+    "vf_reset": {0x8001: ("_op_8xy1_vf", ("x", "y")), 0x8002: ("_op_8xy2_vf", ("x", "y")), # 8XY1/2/3 clear VF (COSMAC)
+                 0x8003: ("_op_8xy3_vf", ("x", "y"))},
+}
+_quirk_tables = {} # (table id, quirks) -> merged table, built once per combination
+
+def quirk_table(table, quirks):
+    key = (id(table), quirks)
+    if key not in _quirk_tables:
+        merged = dict(table)
+        for name in quirks: merged.update(QUIRKS[name])
+        _quirk_tables[key] = merged
+    return _quirk_tables[key]
+
+#--------SNAPSHOT FORMAT-----------#
+# magic, memory, V0-VF, I, PC, stack depth, stack slots, delay timer, sound timer, packed display
+STACK_SLOTS = 16
+SNAPSHOT_MAGIC = b"C8S1"
+SNAPSHOT_LAYOUT = struct.Struct(f">4s4096s16sHHB{STACK_SLOTS}HBB256s")
+DISPLAY_LAYOUT = struct.Struct(">32Q") # Packed display rows
+
+ROW_MASK = (1 << 64) - 1
+ALL_ROWS = (1 << 32) - 1
+BIT_CHARS = bytes.maketrans(b"01", b"\x00\x01") # "0"/"1" text -> 0/1 bytes
+
+# Opcodes that change something on every pass (counters, drawing, RNG, memory writes). A loop with one
+# of these in its body never idles, so its back-edge is decoded without the check_idle() call
+BUSY_OPCODES = {0x7000, 0x8003, 0x8004, 0x8005, 0x8006, 0x8007, 0x800E, 0xC000, 0xD000, 0xF01E, 0xF033, 0xF055}
+
+def quiet_loop(memory, head, jump):
+    # True if jump goes backwards (or to itself) and the straight-line code from head up to it has no BUSY_OPCODES
+    if head > jump: return False
+    for addr in range(head, jump, 2):
+        if opcode_key((memory[addr] << 8) | memory[addr + 1]) in BUSY_OPCODES: return False
+    return True
+
+def opcode_key(opcode):
+    first = opcode & 0xF000
+    if first == 0x0000: return opcode
+    if first == 0x8000: return first | (opcode & 0x000F)
+    if first >= 0xE000: return first | (opcode & 0x00FF)
+    return first
+
+#--------RENDER HELPERS-----------#
+_surface_cache = {} # (width, height, scale) -> (1:1 surface, scaled surface), shared so snapshots never copy them
+
+def load_render_modules():
+    global pygame, np, render_modules_loaded
+    if render_modules_loaded: return
+    import pygame
+    try:
+        import numpy as np
+    except ImportError: # draw() falls back to one rect per pixel without NumPy
+        np = None
+    render_modules_loaded = True
+
+def new_visual_display(width, height):
+    if np is None: return [0.0] * (width * height)
+    return np.zeros((width, height), dtype=np.float64)
+
+def rows_mask(flags):
+    # Per-row booleans -> row bitmask
+    return sum(1 << int(y) for y in np.flatnonzero(flags))
+
+def row_spans(rows):
+    # Row bitmask -> (first row, row count) for each run of consecutive rows
+    spans = []
+    y = 0
+    while rows:
+        if rows & 1:
+            first = y
+            while rows & 1:
+                rows >>= 1
+                y += 1
+            spans.append((first, y - first))
+        else:
+            rows >>= 1
+            y += 1
+    return spans
+
+def render_surfaces(width, height, scale):
+    key = (width, height, scale)
+    if key not in _surface_cache:
+        _surface_cache[key] = (pygame.Surface((width, height)), pygame.Surface((width * scale, height * scale)))
+    return _surface_cache[key]
 
 class Chip8:
+    PIXEL_SHADES = (0.0, 1.0) # Brightness of each pixel value (one bit per plane), 1.0 = FG colour
+    # The renderer only goes by these, Chip8_Extended changes them per instance for 128x64
+    width = 64
+    height = 32
+    all_rows = ALL_ROWS
+
     def __init__(self):
         self.current_rom_path = ""
-        self.bg_colour = (0,0,0)
+        self.rom_hash = "" # SHA-1 of the ROM file, identifies the game regardless of its path
+        self.quirks = frozenset() # Names from QUIRKS that are on
         self.memory = bytearray(4096)
         self.v = bytearray(16)
         self.i = 0
@@ -13,13 +158,29 @@ class Chip8:
         self.stack = []
 
         # --- DISPLAY SEPARATION ---
-        self.display = [0] * (64 * 32)          # True logical state (0 or 1)
-        self.visual_display = [0.0] * (64 * 32) # Fade state (0.0 to 1.0)
+        self.display = [0] * 32                 # True logical state, one 64-bit row per int (bit 63 = column 0)
+        self.visual_display = None              # Fade state (0.0 to 1.0), created on the first draw
+
+        # Rows (bit y = row y) the renderer has to repaint, and what it painted last time
+        self.dirty_rows = ALL_ROWS
+        self.visible_rows = 0
+        self.fading_rows = 0
+        self.last_palette = None
         
         self.delay_timer = 0
         self.sound_timer = 0
         self.keypad = [0] * 16
 
+        # Determinism: CXNN draws from this RNG (seedable), and every instruction bumps cycle_count
+        self.rng = random.Random()
+        self.cycle_count = 0
+        self.recorder = None # Optional input recorder (see Movie.py), told about key changes and timer ticks
+
+        # Idle loop detection (see check_idle)
+        self.run_end = 0        # cycle_count the current run() stops at, 0 outside run()
+        self.idle_loop = None   # (state, cycle_count) at the last loop back-edge
+        self.idle_cycles = 0    # Instructions skipped rather than executed, for stats
+
         fontset = [
             0xF0, 0x90, 0x90, 0x90, 0xF0, 0x20, 0x60, 0x20, 0x20, 0x70,
             0xF0, 0x10, 0xF0, 0x80, 0xF0, 0xF0, 0x10, 0xF0, 0x10, 0xF0,
@@ -33,157 +194,495 @@ class Chip8:
         for i, val in enumerate(fontset):
             self.memory[i] = val
 
+        # Pre-decoded (handler, operands) per address, filled lazily by cycle()
+        self.decode_cache = [None] * len(self.memory)
+
+        # Optional basic-block compiler, used by run() when enabled
+        self.jit_enabled = False
+        self.block_cache = {}  # Start address -> (function, instruction count)
+        self.block_owners = {} # Code address -> start addresses of blocks covering it
+
+    def set_quirks(self, quirks):
+        # Code decoded (or compiled) from now on uses the matching handlers, so everything cached is dropped
+        self.quirks = frozenset(quirks)
+        self.clear_code_caches()
+
     def load_rom(self, path):
         with open(path, "rb") as f:
             rom_data = f.read()
             self.memory[0x200:0x200+len(rom_data)] = rom_data
         self.current_rom_path = path
+        self.rom_hash = hashlib.sha1(rom_data).hexdigest()
+        self.clear_code_caches()
 
     def cycle(self):
-        opcode = (self.memory[self.pc] << 8) | self.memory[self.pc + 1]
-        self.pc += 2
-        
-        x = (opcode & 0x0F00) >> 8
-        y = (opcode & 0x00F0) >> 4
-        n = (opcode & 0x000F)
-        nn = (opcode & 0x00FF)
-        nnn = (opcode & 0x0FFF)
-        
-        self.decode(opcode, x, y, n, nn, nnn)
+        pc = self.pc
+        entry = self.decode_cache[pc]
+        if entry is None: # First visit (or code was overwritten), decode once and keep it
+            entry = self.decode_cache[pc] = self.decode_at(pc)
+        self.pc = pc + 2
+        self.cycle_count += 1
+
+        handler, args = entry
+        return handler(*args) # True only when check_idle() skipped ahead
+
+    def run(self, cycles):
+        end = self.run_end = self.cycle_count + cycles
+        try:
+            if self.jit_enabled:
+                self.run_blocks(end)
+                return
+            while self.cycle_count < end:
+                for _ in range(end - self.cycle_count):
+                    if self.cycle(): break # An idle loop was skipped, recount from the new cycle_count
+        finally:
+            self.run_end = 0
+
+    def run_blocks(self, end):
+        blocks = self.block_cache
+        while True:
+            cycles = end - self.cycle_count
+            if cycles <= 0: return
+            block = blocks.get(self.pc)
+            if block is None:
+                block = self.compile_block(self.pc)
+                if block is None: # Nothing compilable here, let cycle() raise the same error it always has
+                    self.cycle()
+                    continue
+
+            func, length = block
+            if length > cycles: # Block would overrun this budget, finish it one instruction at a time
+                for _ in range(cycles):
+                    if self.cycle(): break
+                continue
+            self.cycle_count += length
+            func(self)
+
+    def check_idle(self):
+        # Called at a loop back-edge (quiet backward 1NNN, FX0A with no key down) with pc at the loop head.
+        # If the previous back-edge went to the same head with the same registers and timers, and nothing
+        # in between drew, wrote memory, used the RNG or changed a key (those reset idle_loop), every further
+        # pass is identical until a timer tick or key change, neither of which can happen inside run()
+        # (even if that previous back-edge was in an earlier run). So the whole passes left in this run are
+        # skipped by counting them and the remainder runs normally, ending in exactly the same state.
+        # Returns True when it skipped, so run() knows cycle_count moved
+        state = (self.pc, bytes(self.v), self.i, tuple(self.stack), self.delay_timer, self.sound_timer)
+        last = self.idle_loop
+        self.idle_loop = (state, self.cycle_count)
+        if last is None or last[0] != state: return False
+
+        period = self.cycle_count - last[1]
+        skip = (self.run_end - self.cycle_count) // period * period
+        if skip <= 0: return False
+        self.cycle_count += skip
+        self.idle_cycles += skip
+        self.idle_loop = (state, self.cycle_count)
+        return True
 
     def decode(self, opcode, x, y, n, nn, nnn):
-        first = (opcode & 0xF000) >> 12
-        match first:
-            case 0x0:
-                if opcode == 0x00E0: #Clear Screen
-                    self.display = [0] * (64 * 32)
-                elif opcode == 0x00EE: self.pc = self.stack.pop()
-            case 0x1: self.pc = nnn
-            case 0x2:
-                self.stack.append(self.pc)
-                self.pc = nnn
-            case 0x3: 
-                if self.v[x] == nn: self.pc += 2
-            case 0x4: 
-                if self.v[x] != nn: self.pc += 2
-            case 0x5: 
-                if self.v[x] == self.v[y]: self.pc += 2
-            case 0x6: self.v[x] = nn
-            case 0x7: self.v[x] = (self.v[x] + nn) & 0xFF
-            case 0x8:
-                if   n == 0x0: self.v[x] = self.v[y]
-                elif n == 0x1: self.v[x] |= self.v[y]
-                elif n == 0x2: self.v[x] &= self.v[y]
-                elif n == 0x3: self.v[x] ^= self.v[y]
-                elif n == 0x4:
-                    total = self.v[x] + self.v[y]
-                    self.v[0xF] = 1 if total > 255 else 0
-                    self.v[x] = total & 0xFF
-                elif n == 0x5:
-                    self.v[0xF] = 1 if self.v[x] >= self.v[y] else 0
-                    self.v[x] = (self.v[x] - self.v[y]) & 0xFF
-                elif n == 0x6:
-                    self.v[0xF] = self.v[x] & 0x1
-                    self.v[x] >>= 1
-                elif n == 0x7:
-                    self.v[0xF] = 1 if self.v[y] >= self.v[x] else 0
-                    self.v[x] = (self.v[y] - self.v[x]) & 0xFF
-                elif n == 0xE:
-                    self.v[0xF] = (self.v[x] & 0x80) >> 7
-                    self.v[x] = (self.v[x] << 1) & 0xFF
-            case 0x9: 
-                if self.v[x] != self.v[y]: self.pc += 2
-            case 0xA: self.i = nnn
-            case 0xB: self.pc = nnn + self.v[0]
-            case 0xC: self.v[x] = random.randint(0, 255) & nn
-            case 0xD: self.draw_sprite(x, y, n)
-            case 0xE:
-                if nn == 0x9E: 
-                    if self.keypad[self.v[x]]: self.pc += 2
-                elif nn == 0xA1: 
-                    if not self.keypad[self.v[x]]: self.pc += 2
-            case 0xF:
-                if nn == 0x07: self.v[x] = self.delay_timer
-                elif nn == 0x15: self.delay_timer = self.v[x]
-                elif nn == 0x18: self.sound_timer = self.v[x]
-                elif nn == 0x1E: self.i = (self.i + self.v[x]) & 0xFFF
-                elif nn == 0x29: self.i = self.v[x] * 5
-                elif nn == 0x33:
-                    self.memory[self.i] = self.v[x] // 100
-                    self.memory[self.i+1] = (self.v[x] // 10) % 10
-                    self.memory[self.i+2] = self.v[x] % 10
-                elif nn == 0x55:
-                    for reg in range(x + 1): self.memory[self.i + reg] = self.v[reg]
-                elif nn == 0x65:
-                    for reg in range(x + 1): self.v[reg] = self.memory[self.i + reg]
-                elif nn == 0x0A:
-                    pressed = False
-                    for idx, key in enumerate(self.keypad):
-                        if key:
-                            self.v[x] = idx
-                            pressed = True
-                            break
-                    if not pressed: self.pc -= 2
+        handler, args = self.predecode(opcode)
+        handler(*args)
+
+    def decode_at(self, pc):
+        opcode = (self.memory[pc] << 8) | self.memory[pc + 1]
+        entry = self.predecode(opcode)
+        # A jump back over a loop that might only be waiting gets the handler that looks for idling
+        if opcode & 0xF000 == 0x1000 and quiet_loop(self.memory, opcode & 0x0FFF, pc):
+            entry = (self._op_1nnn_loop, entry[1])
+        return entry
+
+    #--------DISPATCH TABLE-----------#
+    def predecode(self, opcode):
+        operands = {
+            "x": (opcode & 0x0F00) >> 8,
+            "y": (opcode & 0x00F0) >> 4,
+            "n": (opcode & 0x000F),
+            "nn": (opcode & 0x00FF),
+            "nnn": (opcode & 0x0FFF),
+        }
+        name, fields = quirk_table(OPCODE_TABLE, self.quirks).get(opcode_key(opcode), ("_op_nop", ()))
+        return getattr(self, name), tuple(operands[f] for f in fields)
+
+    def invalidate(self, start, length):
+        # An instruction spans two bytes, so a write at addr also breaks the entry at addr - 1
+        cache = self.decode_cache
+        for addr in range(max(start - 1, 0), min(start + length, len(cache))):
+            cache[addr] = None
+
+        if self.block_owners: # Evict every compiled block that contains a written byte
+            for addr in range(start, start + length):
+                for block_start in self.block_owners.pop(addr, ()):
+                    self.block_cache.pop(block_start, None)
+
+    def clear_code_caches(self):
+        self.idle_loop = None
+        self.decode_cache = [None] * len(self.memory)
+        self.block_cache = {}
+        self.block_owners = {}
+
+    #--------BLOCK COMPILER-----------#
+    def compile_block(self, start):
+        from BlockCompiler import compile_block # Only loaded when the block compiler is in use
+
+        compiled = compile_block(self, start)
+        if compiled is None: return None
+
+        func, length, size = compiled
+        self.block_cache[start] = (func, length)
+        for addr in range(start, start + size):
+            self.block_owners.setdefault(addr, set()).add(start)
+        return func, length
+
+    #--------OPCODE HANDLERS-----------#
+    def _op_nop(self): pass
+
+    def _op_00e0(self): #Clear Screen
+        self.display = [0] * 32
+        self.dirty_rows = ALL_ROWS
+
+    def _op_00ee(self): self.pc = self.stack.pop()
+    def _op_1nnn(self, nnn): self.pc = nnn
+
+    def _op_1nnn_loop(self, nnn): # 1NNN closing a quiet loop (see decode_at)
+        self.pc = nnn
+        return self.check_idle()
+
+    def _op_2nnn(self, nnn):
+        self.stack.append(self.pc)
+        self.pc = nnn
+
+    def _op_3xnn(self, x, nn):
+        if self.v[x] == nn: self.pc += 2
+
+    def _op_4xnn(self, x, nn):
+        if self.v[x] != nn: self.pc += 2
+
+    def _op_5xy0(self, x, y):
+        if self.v[x] == self.v[y]: self.pc += 2
+
+    def _op_6xnn(self, x, nn): self.v[x] = nn
+    def _op_7xnn(self, x, nn): self.v[x] = (self.v[x] + nn) & 0xFF
+    def _op_8xy0(self, x, y): self.v[x] = self.v[y]
+    def _op_8xy1(self, x, y): self.v[x] |= self.v[y]
+    def _op_8xy2(self, x, y): self.v[x] &= self.v[y]
+    def _op_8xy3(self, x, y): self.v[x] ^= self.v[y]
+
+    def _op_8xy4(self, x, y):
+        total = self.v[x] + self.v[y]
+        self.v[0xF] = 1 if total > 255 else 0
+        self.v[x] = total & 0xFF
+
+    def _op_8xy5(self, x, y):
+        self.v[0xF] = 1 if self.v[x] >= self.v[y] else 0
+        self.v[x] = (self.v[x] - self.v[y]) & 0xFF
+
+    def _op_8xy6(self, x, y):
+        self.v[0xF] = self.v[x] & 0x1
+        self.v[x] >>= 1
+
+    def _op_8xy7(self, x, y):
+        self.v[0xF] = 1 if self.v[y] >= self.v[x] else 0
+        self.v[x] = (self.v[y] - self.v[x]) & 0xFF
+
+    def _op_8xye(self, x, y):
+        self.v[0xF] = (self.v[x] & 0x80) >> 7
+        self.v[x] = (self.v[x] << 1) & 0xFF
+
+    #--------QUIRK VARIANTS-----------#
+    def _op_8xy1_vf(self, x, y):
+        self.v[x] |= self.v[y]
+        self.v[0xF] = 0
+
+    def _op_8xy2_vf(self, x, y):
+        self.v[x] &= self.v[y]
+        self.v[0xF] = 0
+
+    def _op_8xy3_vf(self, x, y):
+        self.v[x] ^= self.v[y]
+        self.v[0xF] = 0
+
+    def _op_8xy6_vy(self, x, y):
+        value = self.v[y]
+        self.v[0xF] = value & 0x1
+        self.v[x] = value >> 1
+
+    def _op_8xye_vy(self, x, y):
+        value = self.v[y]
+        self.v[0xF] = (value & 0x80) >> 7
+        self.v[x] = (value << 1) & 0xFF
+
+    def _op_bxnn(self, x, nnn): self.pc = nnn + self.v[x]
+
+    def _op_fx55_i(self, x):
+        self._op_fx55(x)
+        self.i = (self.i + x + 1) % len(self.memory)
+
+    def _op_fx65_i(self, x):
+        self._op_fx65(x)
+        self.i = (self.i + x + 1) % len(self.memory)
+
+    def draw_sprite_clipped(self, x_reg, y_reg, height): self.draw_sprite(x_reg, y_reg, height, False)
+
+    def _op_9xy0(self, x, y):
+        if self.v[x] != self.v[y]: self.pc += 2
+
+    def _op_annn(self, nnn): self.i = nnn
+    def _op_bnnn(self, nnn): self.pc = nnn + self.v[0]
+    def _op_cxnn(self, x, nn):
+        self.v[x] = self.rng.randint(0, 255) & nn
+        self.idle_loop = None
+
+    def _op_ex9e(self, x):
+        if self.keypad[self.v[x]]: self.pc += 2
+
+    def _op_exa1(self, x):
+        if not self.keypad[self.v[x]]: self.pc += 2
+
+    def _op_fx07(self, x): self.v[x] = self.delay_timer
+    def _op_fx15(self, x): self.delay_timer = self.v[x]
+    def _op_fx18(self, x): self.sound_timer = self.v[x]
+    def _op_fx1e(self, x): self.i = (self.i + self.v[x]) & 0xFFF
+    def _op_fx29(self, x): self.i = self.v[x] * 5
+
+    def _op_fx33(self, x):
+        self.memory[self.i] = self.v[x] // 100
+        self.memory[self.i+1] = (self.v[x] // 10) % 10
+        self.memory[self.i+2] = self.v[x] % 10
+        self.invalidate(self.i, 3)
+        self.idle_loop = None
+
+    def _op_fx55(self, x):
+        for reg in range(x + 1): self.memory[self.i + reg] = self.v[reg]
+        self.invalidate(self.i, x + 1)
+        self.idle_loop = None
+
+    def _op_fx65(self, x):
+        for reg in range(x + 1): self.v[reg] = self.memory[self.i + reg]
+
+    def _op_fx0a(self, x):
+        pressed = False
+        for idx, key in enumerate(self.keypad):
+            if key:
+                self.v[x] = idx
+                pressed = True
+                break
+        if not pressed:
+            self.pc -= 2
+            return self.check_idle()
 
     def update_timers(self):
         if self.delay_timer > 0: self.delay_timer -= 1
         if self.sound_timer > 0: self.sound_timer -= 1
+        if self.recorder: self.recorder.timer_tick()
+
+    def set_key(self, key, pressed):
+        pressed = 1 if pressed else 0
+        if self.keypad[key] == pressed: return
+        self.keypad[key] = pressed
+        self.idle_loop = None # May end a wait, see check_idle
+        if self.recorder: self.recorder.key_change(key, pressed)
 
-    def draw_sprite(self, x_reg, y_reg, height):
+    def draw_sprite(self, x_reg, y_reg, height, wrap=True):
         x_start = self.v[x_reg] % 64
         y_start = self.v[y_reg] % 32
         self.v[0xF] = 0
 
+        display = self.display
+        memory = self.memory
+        i = self.i
+        dirty = self.dirty_rows
+        wrap_mask = ROW_MASK if wrap else 0 # Clipping just drops what would have wrapped round
+        if not wrap: height = min(height, 32 - y_start)
         for row in range(height):
-            sprite_byte = self.memory[self.i + row]
-            for col in range(8):
-                if (sprite_byte & (0x80 >> col)):
-                    x_pos = (x_start + col) % 64
-                    y_pos = (y_start + row) % 32
-                    index = x_pos + (y_pos * 64)
-
-                    #XOR
-                    if self.display[index] == 1:
-                        self.v[0xF] = 1
-                        self.display[index] = 0
-                    else:
-                        self.display[index] = 1
+            # Place the byte at column x_start as a 64-bit rotate, so columns wrap around the right edge
+            sprite_bits = memory[i + row] << 56
+            sprite_bits = (sprite_bits >> x_start) | ((sprite_bits << (64 - x_start)) & wrap_mask)
+            y_pos = (y_start + row) % 32
+
+            #XOR (any overlap with lit pixels is a collision)
+            if display[y_pos] & sprite_bits: self.v[0xF] = 1
+            display[y_pos] ^= sprite_bits
+            if sprite_bits: dirty |= 1 << y_pos
+        self.dirty_rows = dirty
+        self.idle_loop = None
+
+    def get_pixels(self):
+        # Flat 64x32 view (index = x + y * 64) of 0/1 values for rendering and hashing
+        packed = int.from_bytes(self.framebuffer_bytes(), "big")
+        return format(packed, "02048b").encode().translate(BIT_CHARS)
+
+    def framebuffer_bytes(self):
+        # Packed 8 bytes per row, 256 bytes total
+        return DISPLAY_LAYOUT.pack(*self.display)
+
+    def load_framebuffer(self, data):
+        # Inverse of framebuffer_bytes, returns the rows that changed
+        rows = DISPLAY_LAYOUT.unpack(data)
+        display = self.display
+        changed = 0
+        for y, row in enumerate(rows):
+            if row != display[y]: changed |= 1 << y
+        self.display = list(rows)
+        return changed
+
+    def get_pixel_array(self):
+        # (width, height) NumPy view of pixel values in surfarray's [x][y] order
+        load_render_modules()
+        bits = np.unpackbits(np.frombuffer(self.framebuffer_bytes(), dtype=np.uint8))
+        return bits.reshape(32, 64).T
+
+    #--------RENDERING-----------#
+    def init_visual_display(self):
+        load_render_modules()
+        self.visual_display = new_visual_display(self.width, self.height)
+        self.dirty_rows = self.all_rows
+
+    def force_redraw(self):
+        # Next draw() repaints everything (new window, exposed window, etc.)
+        self.dirty_rows = self.all_rows
+        self.last_palette = None
+
+    def take_dirty_rows(self):
+        # Rows changed since the last call, then cleared. For cores nothing draws (the threaded core, stream
+        # sessions), which ship framebuffer_bytes() instead, so dirty means "changed since taken"
+        rows = self.dirty_rows
+        self.dirty_rows = 0
+        return rows
+
+    def rows_to_draw(self, scale, bg_color, fg_color, crt_enabled):
+        # Rows whose pixels look different this frame: drawn into, still fading, or recoloured
+        palette = (scale, tuple(bg_color), tuple(fg_color), crt_enabled)
+        last = self.last_palette
+        self.last_palette = palette
+        if last is None or last[:2] != palette[:2] or last[3] != palette[3]:
+            return self.all_rows
+
+        rows = self.dirty_rows | self.fading_rows
+        if last[2] != palette[2]: rows |= self.visible_rows # New FG colour (rainbow mode)
+        return rows
 
     def draw(self, surface, scale, bg_color, fg_color, crt_enabled):
+        # Returns the rects that changed on surface, empty if nothing needed drawing
+        if self.visual_display is None: self.init_visual_display()
+        rows = self.rows_to_draw(scale, bg_color, fg_color, crt_enabled)
+        self.dirty_rows = 0
+        if not rows: return []
+        if np is None:
+            return self.draw_rects(surface, scale, bg_color, fg_color, crt_enabled, rows)
+
         fade_speed = 0.90 if crt_enabled else 0.0 # Instant clear if CRT off
-        
-        for index in range(len(self.display)):
+        width = self.width
+        pixels = self.get_pixel_array()
+        shades = np.array(self.PIXEL_SHADES)
+        bg = np.array(bg_color, dtype=np.float64)
+        fg = np.array(fg_color, dtype=np.float64)
+        lut = None if crt_enabled else (bg + (fg - bg) * shades[:, None]).astype(np.uint8) # Colour per pixel value
+        visual = self.visual_display
+        small, scaled = render_surfaces(width, self.height, scale)
+        direct = surface.get_size() == scaled.get_size()
+
+        # Only bands of changed rows are recomputed, the rest of the buffer can't look any different
+        rects = []
+        for first, count in row_spans(rows):
             # Logic vs Visual separation
-            if self.display[index] == 1:
-                self.visual_display[index] = 1.0
+            values = pixels[:, first:first + count]
+            lit = values > 0
+            band = visual[:, first:first + count]
+            band *= fade_speed
+            np.copyto(band, shades.take(values), where=lit)
+
+            visible = band > 0.01 # Slight threshold for performance
+            mask = (1 << count) - 1 << first
+            self.visible_rows = self.visible_rows & ~mask | rows_mask(visible.any(axis=0)) << first
+            self.fading_rows = self.fading_rows & ~mask | rows_mask((visible & ~lit).any(axis=0)) << first
+
+            # Same lerp as draw_rects, pixels under the threshold show the background. Without CRT
+            # nothing fades, so every pixel is exactly its value's colour
+            if lut is None:
+                colours = bg + (fg - bg) * band[:, :, None]
+                colours[~visible] = bg
+                colours = colours.astype(np.uint8)
             else:
-                self.visual_display[index] *= fade_speed
-            
-            val = self.visual_display[index]
-                
-            if val > 0.01: # Slight threshold for performance
-                x = (index % 64) * scale
-                y = (index // 64) * scale
-                
-                # Linear Interpolation Formula: 
-                # color = bg_color + (fg_color - bg_color) * val
-                r = int(bg_color[0] + (fg_color[0] - bg_color[0]) * val)
-                g = int(bg_color[1] + (fg_color[1] - bg_color[1]) * val)
-                b = int(bg_color[2] + (fg_color[2] - bg_color[2]) * val)
+                colours = lut.take(values, axis=0)
+
+            # Fill the band on the 1:1 surface, then scale up just that band
+            source = small.subsurface((0, first, width, count))
+            pygame.surfarray.blit_array(source, colours)
+            rect = pygame.Rect(0, first * scale, width * scale, count * scale)
+            if direct:
+                pygame.transform.scale(source, rect.size, surface.subsurface(rect))
+            else:
+                pygame.transform.scale(source, rect.size, scaled.subsurface(rect))
+                surface.blit(scaled, rect, rect)
+            rects.append(rect)
+        return rects
+
+    def draw_rects(self, surface, scale, bg_color, fg_color, crt_enabled, rows=None):
+        fade_speed = 0.90 if crt_enabled else 0.0 # Instant clear if CRT off
+        if rows is None: rows = self.all_rows
+        if self.visual_display is None: self.init_visual_display()
+        
+        width = self.width
+        pixels = self.get_pixels()
+        shades = self.PIXEL_SHADES
+        self.visible_rows &= ~rows
+        self.fading_rows &= ~rows
+
+        rects = []
+        for first, count in row_spans(rows):
+            rect = pygame.Rect(0, first * scale, width * scale, count * scale)
+            surface.fill(bg_color, rect)
+            rects.append(rect)
+
+            for index in range(first * width, (first + count) * width):
+                # Logic vs Visual separation
+                if pixels[index]:
+                    self.visual_display[index] = shades[pixels[index]]
+                else:
+                    self.visual_display[index] *= fade_speed
                 
-                pygame.draw.rect(surface, (r, g, b), (x, y, scale, scale))
+                val = self.visual_display[index]
+                    
+                if val > 0.01: # Slight threshold for performance
+                    x = (index % width) * scale
+                    y = (index // width) * scale
+                    self.visible_rows |= 1 << (index // width)
+                    if not pixels[index]: self.fading_rows |= 1 << (index // width)
+                    
+                    # Linear Interpolation Formula: 
+                    # color = bg_color + (fg_color - bg_color) * val
+                    r = int(bg_color[0] + (fg_color[0] - bg_color[0]) * val)
+                    g = int(bg_color[1] + (fg_color[1] - bg_color[1]) * val)
+                    b = int(bg_color[2] + (fg_color[2] - bg_color[2]) * val)
+                    
+                    pygame.draw.rect(surface, (r, g, b), (x, y, scale, scale))
+        return rects
 
+    #--------SNAPSHOTS-----------#
     def get_snapshot(self):
-        return copy.deepcopy(self)
+        # One fixed-layout bytes blob (see SNAPSHOT_LAYOUT)
+        depth = len(self.stack)
+        if depth > STACK_SLOTS:
+            raise ValueError(f"Stack too deep to snapshot ({depth} > {STACK_SLOTS})")
+        stack = self.stack + [0] * (STACK_SLOTS - depth)
+        return SNAPSHOT_LAYOUT.pack(SNAPSHOT_MAGIC, self.memory, self.v, self.i, self.pc, depth, *stack,
+                                    self.delay_timer, self.sound_timer, self.framebuffer_bytes())
 
     def load_snapshot(self, snapshot):
         # Overwrite current state with the saved state
-        self.memory = copy.deepcopy(snapshot.memory)
-        self.v = copy.deepcopy(snapshot.v)
-        self.i = snapshot.i
-        self.pc = snapshot.pc
-        self.stack = copy.deepcopy(snapshot.stack)
-        self.display = copy.deepcopy(snapshot.display)
-        self.delay_timer = snapshot.delay_timer
-        self.sound_timer = snapshot.sound_timer
-        # We usually don't save keypad state to avoid "stuck" keys
\ No newline at end of file
+        if len(snapshot) != SNAPSHOT_LAYOUT.size:
+            raise ValueError("Not a CHIP-8 snapshot")
+        fields = SNAPSHOT_LAYOUT.unpack(snapshot)
+        magic, memory, v, i, pc, depth = fields[:6]
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a CHIP-8 snapshot")
+
+        self.i, self.pc = i, pc
+        self.memory = bytearray(memory)
+        self.clear_code_caches()
+        self.v = bytearray(v)
+        self.stack = list(fields[6:6 + depth])
+        self.delay_timer, self.sound_timer, display = fields[6 + STACK_SLOTS:]
+        self.display = list(DISPLAY_LAYOUT.unpack(display))
+        self.dirty_rows = ALL_ROWS
+        # We usually don't save keypad state to avoid "stuck" keys
@@ -0,0 +1,302 @@
+import struct
+
+import Chip8_Emulator
+from Chip8_Emulator import Chip8, OPCODE_TABLE, STACK_SLOTS, opcode_key, quirk_table
+
+EXTENDED_EXTENSIONS = (".sc8", ".xo8") # ROM files that get the extended core (see core_for_rom)
+
+#--------OPCODE TABLE-----------#
+# SUPER-CHIP 1.1 and XO-CHIP on top of the base table, keyed by extended_key()
+EXTENDED_TABLE = dict(OPCODE_TABLE)
+EXTENDED_TABLE.update({
+    0x00C0: ("_op_00cn", ("n",)),   # Scroll down N rows
+    0x00D0: ("_op_00dn", ("n",)),   # Scroll up N rows (XO-CHIP)
+    0x00FB: ("_op_00fb", ()),       # Scroll right 4 pixels
+    0x00FC: ("_op_00fc", ()),       # Scroll left 4 pixels
+    0x00FD: ("_op_00fd", ()),       # Exit
+    0x00FE: ("_op_00fe", ()),       # Low resolution (64x32)
+    0x00FF: ("_op_00ff", ()),       # High resolution (128x64)
+    0x5002: ("_op_5xy2", ("x", "y")), # Save VX..VY at I (XO-CHIP)
+    0x5003: ("_op_5xy3", ("x", "y")), # Load VX..VY from I (XO-CHIP)
+    0xF000: ("_op_f000", ()),       # I = next 16-bit word (XO-CHIP, 4-byte instruction)
+    0xF001: ("_op_fn01", ("x",)),   # Select drawing planes (XO-CHIP)
+    0xF002: ("_op_f002", ()),       # Load 16-byte audio pattern from I (XO-CHIP)
+    0xF030: ("_op_fx30", ("x",)),   # I = big font digit
+    0xF03A: ("_op_fx3a", ("x",)),   # Audio pitch (XO-CHIP)
+    0xF075: ("_op_fx75", ("x",)),   # Save V0..VX to the flag registers
+    0xF085: ("_op_fx85", ("x",)),   # Load V0..VX from the flag registers
+})
+
+def extended_key(opcode):
+    if opcode & 0xFFE0 == 0x00C0: return opcode & 0xFFF0 # 00CN / 00DN
+    if opcode & 0xF00E == 0x5002: return opcode & 0xF00F # 5XY2 / 5XY3
+    return opcode_key(opcode)
+
+#--------SNAPSHOT FORMAT-----------#
+# magic, memory, V0-VF, I, PC, stack depth, stack slots, delay timer, sound timer, hires, plane mask, pitch,
+# flag registers, audio pattern, both planes as 64 rows of 16 bytes (lores only uses the first 32)
+EXTENDED_SNAPSHOT_MAGIC = b"C8X1"
+EXTENDED_SNAPSHOT_LAYOUT = struct.Struct(f">4s65536s16sHHB{STACK_SLOTS}HBBBBB16s16s2048s")
+
+BIG_FONT_ADDRESS = 0x50 # Right after the small font
+BIG_FONT = [
+    0xFF, 0xFF, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0x18, 0x78, 0x78, 0x18, 0x18, 0x18, 0x18, 0x18, 0xFF, 0xFF,
+    0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,
+    0xC3, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0x03, 0x03, 0x03, 0x03, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0xFF, 0xFF, 0x03, 0x03, 0x06, 0x0C, 0x18, 0x18, 0x18, 0x18,
+    0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,
+    0x7E, 0xFF, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xC3, 0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC,
+    0x3C, 0xFF, 0xC3, 0xC0, 0xC0, 0xC0, 0xC0, 0xC3, 0xFF, 0x3C, 0xFC, 0xFE, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFE, 0xFC,
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xC0, 0xC0,
+]
+
+#--------CORE SELECTION-----------#
+def core_for_rom(path):
+    # A fresh core that can run the ROM at path, by file extension
+    return Chip8Extended() if path.lower().endswith(EXTENDED_EXTENSIONS) else Chip8()
+
+def core_for_snapshot(snapshot):
+    return Chip8Extended() if snapshot[:4] == EXTENDED_SNAPSHOT_MAGIC else Chip8()
+
+#--------EXTENDED CORE-----------#
+class Chip8Extended(Chip8):
+    # SUPER-CHIP / XO-CHIP: 64 KB of memory, 64x32 or 128x64, two bit-planes. Each plane is a list of row
+    # ints like the base display (bit width-1 = column 0), so drawing is the same rotate-and-XOR per row,
+    # scrolling is a list slice (vertical) or one shift per row (horizontal), and the renderer sees
+    # width/height/PIXEL_SHADES and nothing else. Pixel value = plane 1 bit | plane 2 bit << 1
+    PIXEL_SHADES = (0.0, 1.0, 0.5, 0.75)
+
+    def __init__(self):
+        self.planes = [[0] * 32, [0] * 32] # Before Chip8.__init__, which sets display (= plane 1)
+        super().__init__()
+        memory = bytearray(0x10000)
+        memory[:len(self.memory)] = self.memory # Small font
+        memory[BIG_FONT_ADDRESS:BIG_FONT_ADDRESS + len(BIG_FONT)] = bytes(BIG_FONT)
+        self.memory = memory
+        self.clear_code_caches()
+
+        self.plane_mask = 1             # Planes that draw, clear and scroll (FN01)
+        self.flags = bytearray(16)      # FX75/FX85 flag registers
+        # XO-CHIP audio state, kept for snapshots (the beeper plays its own tone)
+        self.audio_pattern = bytes(16)  # F002
+        self.audio_pitch = 64           # FX3A
+        self.set_resolution(False)      # Instance state, so a reset (Ctrl+R re-runs __init__) drops hires too
+
+    # The block compiler only knows the base instruction set (and 2-byte skips), so this core always interprets
+    @property
+    def jit_enabled(self): return False
+
+    @jit_enabled.setter
+    def jit_enabled(self, value): pass
+
+    @property
+    def display(self): return self.planes[0]
+
+    @property
+    def hires(self): return self.width == 128
+
+    @display.setter
+    def display(self, rows): self.planes[0] = rows
+
+    def predecode(self, opcode):
+        operands = {
+            "x": (opcode & 0x0F00) >> 8,
+            "y": (opcode & 0x00F0) >> 4,
+            "n": (opcode & 0x000F),
+            "nn": (opcode & 0x00FF),
+            "nnn": (opcode & 0x0FFF),
+        }
+        name, fields = quirk_table(EXTENDED_TABLE, self.quirks).get(extended_key(opcode), ("_op_nop", ()))
+        return getattr(self, name), tuple(operands[f] for f in fields)
+
+    #--------DISPLAY-----------#
+    def set_resolution(self, hires):
+        # Switching clears the screen, and the renderer reallocates at the new size on its next draw
+        self.width, self.height = (128, 64) if hires else (64, 32)
+        self.all_rows = (1 << self.height) - 1
+        self.planes = [[0] * self.height, [0] * self.height]
+        self.visual_display = None
+        self.visible_rows = 0
+        self.fading_rows = 0
+        self.last_palette = None
+        self.dirty_rows = self.all_rows
+        self.idle_loop = None
+
+    def selected_planes(self):
+        return [plane for index, plane in enumerate(self.planes) if self.plane_mask >> index & 1]
+
+    def framebuffer_bytes(self):
+        # Both planes, width / 8 bytes per row: 512 bytes in lores, 2048 in hires
+        size = self.width // 8
+        return b"".join(row.to_bytes(size, "big") for plane in self.planes for row in plane)
+
+    def load_framebuffer(self, data):
+        hires = len(data) == 2048
+        if hires != self.hires: self.set_resolution(hires)
+        size = self.width // 8
+        changed = 0
+        for index, plane in enumerate(self.planes):
+            offset = index * self.height * size
+            for y in range(self.height):
+                row = int.from_bytes(data[offset + y * size:offset + (y + 1) * size], "big")
+                if row != plane[y]:
+                    plane[y] = row
+                    changed |= 1 << y
+        return changed
+
+    def get_pixels(self):
+        # Flat width x height pixel values (0-3), index = x + y * width
+        size = self.width * self.height
+        first, second = [format(int.from_bytes(b"".join(row.to_bytes(self.width // 8, "big") for row in plane), "big"),
+                                f"0{size}b") for plane in self.planes]
+        return bytes((a == "1") | (b == "1") << 1 for a, b in zip(first, second))
+
+    def get_pixel_array(self):
+        Chip8_Emulator.load_render_modules()
+        np = Chip8_Emulator.np
+        bits = np.unpackbits(np.frombuffer(self.framebuffer_bytes(), dtype=np.uint8)).reshape(2, self.height, self.width)
+        return (bits[0] | bits[1] << 1).T
+
+    def draw_sprite(self, x_reg, y_reg, height, wrap=True):
+        # N = 0 draws 16x16. With both planes selected the sprite data for plane 2 follows plane 1's
+        width = self.width
+        x_start = self.v[x_reg] % width
+        y_start = self.v[y_reg] % self.height
+        wide = height == 0
+        rows = 16 if wide else height
+        shift = width - (16 if wide else 8)
+        wrap_mask = (1 << width) - 1 if wrap else 0
+        visible = rows if wrap else min(rows, self.height - y_start)
+
+        memory = self.memory
+        dirty = self.dirty_rows
+        collided = 0
+        for index, display in enumerate(self.selected_planes()):
+            i = self.i + index * (rows * 2 if wide else rows)
+            for row in range(visible):
+                if wide:
+                    sprite_bits = (memory[(i + row * 2) & 0xFFFF] << 8 | memory[(i + row * 2 + 1) & 0xFFFF]) << shift
+                else:
+                    sprite_bits = memory[(i + row) & 0xFFFF] << shift
+                # Rotate into place so columns wrap around the right edge, as the base core
+                sprite_bits = (sprite_bits >> x_start) | ((sprite_bits << (width - x_start)) & wrap_mask)
+                y_pos = (y_start + row) % self.height
+                if display[y_pos] & sprite_bits: collided = 1
+                display[y_pos] ^= sprite_bits
+                if sprite_bits: dirty |= 1 << y_pos
+        self.v[0xF] = collided
+        self.dirty_rows = dirty
+        self.idle_loop = None
+
+    #--------SKIPS-----------#
+    def skip(self):
+        # The next instruction is 4 bytes long if it's F000 NNNN
+        pc = self.pc
+        self.pc = pc + (4 if self.memory[pc] == 0xF0 and self.memory[pc + 1] == 0x00 else 2)
+
+    def _op_3xnn(self, x, nn):
+        if self.v[x] == nn: self.skip()
+
+    def _op_4xnn(self, x, nn):
+        if self.v[x] != nn: self.skip()
+
+    def _op_5xy0(self, x, y):
+        if self.v[x] == self.v[y]: self.skip()
+
+    def _op_9xy0(self, x, y):
+        if self.v[x] != self.v[y]: self.skip()
+
+    def _op_ex9e(self, x):
+        if self.keypad[self.v[x] & 0xF]: self.skip()
+
+    def _op_exa1(self, x):
+        if not self.keypad[self.v[x] & 0xF]: self.skip()
+
+    #--------OPCODE HANDLERS-----------#
+    def _op_00e0(self):
+        for plane in self.selected_planes(): plane[:] = [0] * self.height
+        self.dirty_rows = self.all_rows
+
+    def scroll(self, shift_rows):
+        for plane in self.selected_planes(): plane[:] = shift_rows(plane)
+        self.dirty_rows = self.all_rows
+        self.idle_loop = None
+
+    def _op_00cn(self, n):
+        if n: self.scroll(lambda rows: [0] * n + rows[:-n])
+
+    def _op_00dn(self, n):
+        if n: self.scroll(lambda rows: rows[n:] + [0] * n)
+
+    def _op_00fb(self): self.scroll(lambda rows: [row >> 4 for row in rows])
+
+    def _op_00fc(self):
+        mask = (1 << self.width) - 1
+        self.scroll(lambda rows: [(row << 4) & mask for row in rows])
+
+    def _op_00fd(self): # Exit: park on this instruction
+        self.pc -= 2
+        return self.check_idle()
+
+    def _op_00fe(self): self.set_resolution(False)
+    def _op_00ff(self): self.set_resolution(True)
+
+    def _op_5xy2(self, x, y):
+        registers = range(x, y + 1) if x <= y else range(x, y - 1, -1)
+        for offset, reg in enumerate(registers): self.memory[(self.i + offset) & 0xFFFF] = self.v[reg]
+        self.invalidate(self.i, len(registers))
+        self.idle_loop = None
+
+    def _op_5xy3(self, x, y):
+        registers = range(x, y + 1) if x <= y else range(x, y - 1, -1)
+        for offset, reg in enumerate(registers): self.v[reg] = self.memory[(self.i + offset) & 0xFFFF]
+
+    def _op_f000(self):
+        pc = self.pc
+        self.i = (self.memory[pc] << 8) | self.memory[pc + 1]
+        self.pc = pc + 2
+
+    def _op_fn01(self, x): self.plane_mask = x & 0x3
+    def _op_f002(self): self.audio_pattern = bytes(self.memory[self.i:self.i + 16])
+    def _op_fx1e(self, x): self.i = (self.i + self.v[x]) & 0xFFFF
+    def _op_fx30(self, x): self.i = BIG_FONT_ADDRESS + (self.v[x] & 0xF) * 10
+    def _op_fx3a(self, x): self.audio_pitch = self.v[x]
+
+    def _op_fx75(self, x):
+        self.flags[:x + 1] = self.v[:x + 1]
+        self.idle_loop = None
+
+    def _op_fx85(self, x): self.v[:x + 1] = self.flags[:x + 1]
+
+    #--------SNAPSHOTS-----------#
+    def get_snapshot(self):
+        depth = len(self.stack)
+        if depth > STACK_SLOTS:
+            raise ValueError(f"Stack too deep to snapshot ({depth} > {STACK_SLOTS})")
+        stack = self.stack + [0] * (STACK_SLOTS - depth)
+        display = b"".join(row.to_bytes(16, "big") for plane in self.planes for row in plane + [0] * (64 - len(plane)))
+        return EXTENDED_SNAPSHOT_LAYOUT.pack(EXTENDED_SNAPSHOT_MAGIC, self.memory, self.v, self.i, self.pc, depth, *stack,
+                                             self.delay_timer, self.sound_timer, self.hires, self.plane_mask, self.audio_pitch,
+                                             self.flags, self.audio_pattern, display)
+
+    def load_snapshot(self, snapshot):
+        if len(snapshot) != EXTENDED_SNAPSHOT_LAYOUT.size:
+            raise ValueError("Not an extended CHIP-8 snapshot")
+        fields = EXTENDED_SNAPSHOT_LAYOUT.unpack(snapshot)
+        magic, memory, v, i, pc, depth = fields[:6]
+        if magic != EXTENDED_SNAPSHOT_MAGIC:
+            raise ValueError("Not an extended CHIP-8 snapshot")
+
+        self.i, self.pc = i, pc
+        self.memory = bytearray(memory)
+        self.clear_code_caches()
+        self.v = bytearray(v)
+        self.stack = list(fields[6:6 + depth])
+        (self.delay_timer, self.sound_timer, hires, self.plane_mask, self.audio_pitch,
+         flags, self.audio_pattern, display) = fields[6 + STACK_SLOTS:]
+        self.flags = bytearray(flags)
+        self.set_resolution(bool(hires))
+        for index, plane in enumerate(self.planes):
+            for y in range(self.height):
+                offset = (index * 64 + y) * 16
+                plane[y] = int.from_bytes(display[offset:offset + 16], "big")
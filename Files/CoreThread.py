@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import deque
+
+from Scheduler import FRAME_TIME
+
+#--------SHARED FRAMEBUFFER-----------#
+class SharedFrame:
+    # Double-buffered packed display (see Chip8.framebuffer_bytes). The writer fills the back
+    # buffer and then flips front, a reader copies the front buffer and retries if the writer has come
+    # back round to it meanwhile (its sequence number is odd while being written). Neither side locks,
+    # and the writer never waits for a slow reader
+    def __init__(self):
+        self.buffers = [bytearray(256), bytearray(256)]
+        self.sequences = [0, 0]
+        self.front = 0
+        self.frame = 0 # Frames published so far
+
+    def publish(self, data):
+        back = self.front ^ 1
+        self.sequences[back] += 1
+        self.buffers[back][:] = data
+        self.sequences[back] += 1
+        self.front = back
+        self.frame += 1
+
+    def read(self):
+        # (frame number, packed display) of the newest complete frame
+        while True:
+            frame = self.frame
+            front = self.front
+            sequence = self.sequences[front]
+            if sequence & 1:
+                time.sleep(0) # Mid-write: let the writer have the GIL rather than spinning against it
+                continue
+            data = bytes(self.buffers[front])
+            if self.sequences[front] == sequence: return frame, data
+
+#--------CORE THREAD-----------#
+class CoreThread:
+    # Runs step(dt) for one Chip8 on a background thread, paced by the 60 Hz frame clock, so a slow draw
+    # or flip on the main thread no longer costs emulated instructions. Keypad changes come in through a
+    # deque (append/popleft are atomic, no lock), finished frames go out through a SharedFrame and the
+    # main thread draws them from view. Anything else that touches the Chip8 from outside (save states,
+    # reset, recording...) must hold lock, which the core only lets go of between steps
+    def __init__(self, chip8_instance, step):
+        self.chip8 = chip8_instance
+        self.step = step
+        self.lock = threading.Lock()
+        self.inputs = deque()
+        self.frame = SharedFrame()
+        self.view = type(chip8_instance)() # Draw-only copy of the display, owned by the main thread
+        self.view_frame = -1
+        self.step_time = 0.0   # Seconds the last step took
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.publish()
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, name="chip8-core", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread: self.thread.join()
+        self.thread = None
+        self.apply_inputs() # Releases queued after the last step still reach the keypad
+
+    def set_key(self, key, pressed):
+        self.inputs.append((key, pressed))
+
+    def apply_inputs(self):
+        inputs = self.inputs
+        while inputs:
+            key, pressed = inputs.popleft()
+            self.chip8.set_key(key, pressed)
+
+    def publish(self):
+        chip8 = self.chip8
+        chip8.take_dirty_rows()
+        self.frame.publish(chip8.framebuffer_bytes())
+
+    def loop(self):
+        chip8 = self.chip8
+        last = deadline = time.perf_counter()
+        while self.running:
+            with self.lock:
+                self.apply_inputs()
+                start = time.perf_counter()
+                self.step(start - last)
+                last = start
+                if chip8.dirty_rows: self.publish()
+                self.step_time = time.perf_counter() - start
+
+            deadline += FRAME_TIME
+            delay = deadline - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            else: deadline = time.perf_counter() # Behind, the scheduler's catch-up limit deals with it
+
+    def update_view(self):
+        # Brings view up to the newest published frame, marking only the rows that changed. Returns view
+        view = self.view
+        if self.frame.frame == self.view_frame: return view
+        self.view_frame, data = self.frame.read()
+        view.dirty_rows |= view.load_framebuffer(data)
+        return view
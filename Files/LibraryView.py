@@ -0,0 +1,198 @@
+import os
+import tkinter as tk
+
+ROW_HEIGHT = 36 # Every item (header or ROM) is one fixed-height row, so row index = y // ROW_HEIGHT
+
+FAVORITES_HEADER = ("FAVORITES", ("Arial", 12, "bold"), "orange")
+SECTION_FONT = ("Arial", 10, "bold")
+THUMBNAIL_COLOURS = ("#00ff00", "#0a140a") # Foreground, background (the Default profile's)
+BLANK_THUMBNAIL = bytes(256) # Shown until a ROM's thumbnail is ready
+
+# XBM stores the leftmost pixel of each byte in the low bit, packed displays in the high bit
+BIT_REVERSED = bytes(int(f"{byte:08b}"[::-1], 2) for byte in range(256))
+
+def thumbnail_image(bitmap):
+    # Packed 64x32 display (see Thumbnails.thumbnail_bitmap) as a Tk image, drawn at 1:1
+    bits = ",".join(f"0x{BIT_REVERSED[byte]:02x}" for byte in bitmap)
+    data = f"#define thumb_width 64\n#define thumb_height 32\nstatic char thumb_bits[] = {{{bits}}};"
+    return tk.BitmapImage(data=data, foreground=THUMBNAIL_COLOURS[0], background=THUMBNAIL_COLOURS[1])
+
+#--------ROW WIDGETS-----------#
+class RowSlot:
+    # One pooled row: a header label and the ROM widgets, only one of the two is packed at a time
+    def __init__(self, view):
+        self.path = None
+        self.kind = None
+        self.state = None
+
+        self.frame = tk.Frame(view.canvas)
+        self.header = tk.Label(self.frame)
+
+        self.var = tk.StringVar()
+        self.dropdown = tk.OptionMenu(self.frame, self.var, "")
+        self.dropdown.config(width=10)
+        self.thumbnail = tk.Label(self.frame, bd=0)
+        self.fav_btn = tk.Button(self.frame, width=3, command=lambda: view.toggle_favorite(self.path))
+        self.rom_btn = tk.Button(self.frame, anchor="w", command=lambda: view.on_load(self.path))
+
+        self.window = view.canvas.create_window(0, -2 * ROW_HEIGHT, window=self.frame, anchor="nw",
+                                                width=view.width, height=ROW_HEIGHT)
+
+    def set_kind(self, kind):
+        if kind == self.kind: return
+        self.kind = kind
+        if kind == "rom":
+            self.header.pack_forget()
+            self.dropdown.pack(side="right", padx=(0, 10))
+            self.thumbnail.pack(side="left", padx=(10, 0))
+            self.fav_btn.pack(side="left", padx=(6, 0))
+            self.rom_btn.pack(side="left", fill="x", expand=True)
+        else:
+            self.dropdown.pack_forget()
+            self.thumbnail.pack_forget()
+            self.fav_btn.pack_forget()
+            self.rom_btn.pack_forget()
+            self.header.pack(side="bottom")
+
+#--------VIRTUALIZED LIST-----------#
+class LibraryList:
+    # Library rows on a canvas with only enough widgets to fill the window. Scrolling moves the pooled
+    # rows and re-binds them to whichever items are now visible; favourite and profile changes update
+    # the data and re-bind the visible rows, nothing is destroyed or rebuilt
+    def __init__(self, parent, on_load, on_favorite, on_profile):
+        self.on_load = on_load         # (path)
+        self.on_favorite = on_favorite # (path), after the toggle is saved the list updates itself
+        self.on_profile = on_profile   # (path, profile name)
+
+        self.sections = []       # (header, [(filename, path)]), header None for loose ROMs
+        self.favorites = []
+        self.profiles = {}       # path -> assigned profile name
+        self.profile_options = []
+        self.rom_hashes = {}     # path -> content hash, thumbnails are shared by ROMs with the same content
+        self.bitmaps = {}        # rom_hash -> packed 64x32 thumbnail
+        self.images = {}         # rom_hash -> its Tk image, made the first time a row shows it
+        self.blank = thumbnail_image(BLANK_THUMBNAIL)
+        self.items = []          # ("header", text, font, colour) / ("rom", filename, path) / ("empty", text)
+        self.slots = []
+        self.width = 1
+
+        self.canvas = tk.Canvas(parent, highlightthickness=0, yscrollincrement=ROW_HEIGHT)
+        self.scrollbar = tk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind_all("<MouseWheel>", lambda e: self.canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
+
+    #------DATA------
+    def set_library(self, sections, favorites, profiles, profile_options, rom_hashes=None):
+        self.sections = sections
+        self.favorites = list(favorites)
+        self.profiles = profiles
+        if rom_hashes is not None: self.rom_hashes = rom_hashes
+        if profile_options != self.profile_options:
+            self.profile_options = profile_options
+            for slot in self.slots:
+                self.fill_menu(slot)
+        self.layout()
+
+    def layout(self):
+        items = []
+        if self.favorites:
+            items.append(("header",) + FAVORITES_HEADER)
+            items += [("rom", os.path.basename(path), path) for path in self.favorites]
+        for header, rows in self.sections:
+            if header: items.append(("header", header, SECTION_FONT, "blue"))
+            items += [("rom", filename, path) for filename, path in rows]
+        if not items:
+            items.append(("empty", "No ROMs found in /ROMS"))
+
+        self.items = items
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(items) * ROW_HEIGHT))
+        self.refresh()
+
+    def add_thumbnails(self, bitmaps):
+        # {rom_hash: bitmap}, only rows on screen are redrawn
+        for rom_hash, bitmap in bitmaps.items():
+            if self.bitmaps.get(rom_hash) == bitmap: continue
+            self.bitmaps[rom_hash] = bitmap
+            self.images.pop(rom_hash, None)
+        self.refresh()
+
+    def thumbnail(self, path):
+        rom_hash = self.rom_hashes.get(path)
+        if rom_hash not in self.bitmaps: return self.blank
+        image = self.images.get(rom_hash)
+        if image is None: image = self.images[rom_hash] = thumbnail_image(self.bitmaps[rom_hash])
+        return image
+
+    def toggle_favorite(self, path):
+        self.on_favorite(path)
+        if path in self.favorites: self.favorites.remove(path)
+        else: self.favorites.append(path)
+        self.layout()
+
+    def pick_profile(self, slot, name):
+        self.profiles[slot.path] = name
+        self.on_profile(slot.path, name)
+        self.refresh() # The same ROM can be visible twice (favourites and its folder)
+
+    def fill_menu(self, slot):
+        menu = slot.dropdown["menu"]
+        menu.delete(0, "end")
+        for name in self.profile_options:
+            menu.add_command(label=name, command=lambda name=name, slot=slot: self.pick_profile(slot, name))
+
+    #------VIEW------
+    def on_resize(self, event):
+        self.width = event.width
+        needed = event.height // ROW_HEIGHT + 2
+        while len(self.slots) < needed:
+            slot = RowSlot(self)
+            self.fill_menu(slot)
+            self.slots.append(slot)
+        for slot in self.slots:
+            self.canvas.itemconfigure(slot.window, width=self.width)
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(self.items) * ROW_HEIGHT))
+        self.refresh()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def refresh(self):
+        first = max(0, int(self.canvas.canvasy(0)) // ROW_HEIGHT)
+        for n, slot in enumerate(self.slots):
+            index = first + n
+            if index < len(self.items):
+                self.canvas.coords(slot.window, 0, index * ROW_HEIGHT)
+                self.bind_slot(slot, self.items[index])
+            else:
+                self.canvas.coords(slot.window, 0, -2 * ROW_HEIGHT) # Parked above the scroll region
+
+    def bind_slot(self, slot, item):
+        kind = item[0]
+        if kind == "rom":
+            path = item[2]
+            state = (item, path in self.favorites, self.profiles.get(path), self.thumbnail(path))
+        else:
+            state = (item,)
+        if state == slot.state: return # Widgets already show this item, skip the Tk calls
+        slot.state = state
+
+        slot.set_kind(kind)
+        if kind == "rom":
+            slot.path = path
+            is_fav = state[1]
+            slot.fav_btn.config(text="★" if is_fav else "☆", fg="orange" if is_fav else "black")
+            slot.rom_btn.config(text=item[1])
+            slot.thumbnail.config(image=state[3])
+            slot.var.set(state[2] or "")
+        elif kind == "header":
+            slot.path = None
+            slot.header.config(text=item[1], font=item[2], fg=item[3])
+        else:
+            slot.path = None
+            slot.header.config(text=item[1], font="TkDefaultFont", fg="black")
@@ -1,37 +1,100 @@
-import pygame
+import time
+STARTUP_CLOCK = time.perf_counter() # Cold start is measured from here until the library window is idle
+
 import tkinter as tk
 from tkinter import messagebox, colorchooser
 import os
 import sys
-from Chip8_Emulator import Chip8
+import threading
+import multiprocessing
+from contextlib import nullcontext
+from Chip8_Emulator import QUIRKS, load_render_modules
+from Chip8_Extended import core_for_rom
+from Rewind import RewindBuffer
+from Movie import MovieRecorder
+from Capture import Capture
+from Scheduler import FrameScheduler
+from CoreThread import CoreThread
+from Profiler import Profiler
+import Audio
 import SettingsManager as sm # Merged DB logic into this
+import RomLibrary as rl
+from Thumbnails import ThumbnailCache
+from LibraryView import LibraryList
 
 SCALE = 12
 SCREEN_WIDTH = 64 * SCALE
 SCREEN_HEIGHT = 32 * SCALE
+REWIND_MEMORY = 16 * 1024 * 1024 # Bytes of rewind history (several minutes of play)
+MOVIE_DIR = "MOVIES"
+CAPTURE_DIR = "CAPTURES"
+PROFILE_DIR = "PROFILES"
+AUDIO_BUFFER = Audio.MIXER_BUFFER # Mixer buffer in samples, lower = less latency (raise it if the beep crackles)
+STARTUP_BUDGET = 0.35 # Seconds from launch to a usable library window, reported on every cold start
 
 #--------HELPERS-----------#
 def hex_to_rgb(hex_col):
     hex_col = hex_col.lstrip('#')
     return tuple(int(hex_col[i:i+2], 16) for i in (0, 2, 4))
 
+#-----------RUNTIME----------#
+# pygame (and NumPy, through the core) is imported when the first game starts, not at launch.
+# The window and mixer are then kept for the whole session and only hidden between ROMs
+game_window = None # (screen, beeper)
+
+def open_game_window():
+    global game_window
+    import pygame
+    if game_window is None:
+        Audio.init_mixer(AUDIO_BUFFER)
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.mixer.init()
+        game_window = (screen, Audio.Beeper())
+    else:
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SHOWN)
+        pygame.event.clear() # Anything queued while hidden belongs to the last game
+    return game_window
+
+def hide_game_window():
+    import pygame
+    screen, beeper = game_window
+    beeper.stop()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.HIDDEN)
+
+def shutdown():
+    if game_window:
+        import pygame
+        pygame.quit()
+    sm.close_db()
+
+def report_startup():
+    elapsed = time.perf_counter() - STARTUP_CLOCK
+    budget = "" if elapsed <= STARTUP_BUDGET else f" (over the {STARTUP_BUDGET * 1000:.0f} ms budget)"
+    print(f"Library ready in {elapsed * 1000:.0f} ms{budget}")
+
+    # Import the renderer in the background while a game is picked, so the first launch doesn't wait on it
+    threading.Thread(target=load_render_modules, daemon=True).start()
+
 #-----------GAME LOOP----------#
 def main(chip8_instance, config):
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption(f"CHIP-8 | Profile: {config['name']}")
+    import pygame
+    screen, beeper = open_game_window()
+    chip8_instance.force_redraw() # The reused window still shows the last game
 
     # Apply Configuration
     BG_COLOR = hex_to_rgb(config['bg_color'])
     FG_COLOR = hex_to_rgb(config['fg_color'])
     IPS = config['ips']
     CRT = bool(config['crt_enabled'])
-    chip8_instance.bg_colour = BG_COLOR
+    JIT = bool(config.get('jit_enabled', 0))
+    THREADED = bool(config.get('threaded_enabled', 0))
+    ACTIVE_QUIRKS = [name for name in QUIRKS if config.get(f'quirk_{name}', 0)]
+    chip8_instance.jit_enabled = JIT
+    chip8_instance.set_quirks(ACTIVE_QUIRKS)
 
-    pygame.mixer.init()
-    beep = pygame.mixer.Sound(buffer=bytes([128] * 441))
     clock = pygame.time.Clock()
-    accumulator = 0.0
+    scheduler = FrameScheduler(IPS)
     
     mapping = {
         pygame.K_1: 0x1, pygame.K_2: 0x2, pygame.K_3: 0x3, pygame.K_4: 0xC,
@@ -44,11 +107,99 @@ def main(chip8_instance, config):
     RAINBOW = bool(config.get('rainbow_enabled', 0))
 
     running = True
-    saved_state = None
+    save_slot = 1
     paused = False
+    rewind = RewindBuffer(REWIND_MEMORY)
+    rewinding = False
+    fast_forward = False
+    recorder = None
+    capture = None
+    profiler = None
+    overlay_font = None
+
+    def update_caption():
+        caption = f"CHIP-8 | Profile: {config['name']} | Slot {save_slot}"
+        if recorder: caption += " [REC]"
+        if capture: caption += " [GIF]"
+        if scheduler.measured_ips: caption += f" | {scheduler.measured_ips:,.0f} IPS"
+        if scheduler.idle_share >= 0.01: caption += f" ({scheduler.idle_share:.0%} idle)"
+        if fast_forward: caption += f" [FF x{scheduler.speed:.1f}]"
+        pygame.display.set_caption(caption + (" [PAUSED]" if paused else ""))
+    update_caption()
+
+    def stop_recording(reason=""):
+        # Loading state or resetting breaks the recorded timeline, so the movie ends there
+        nonlocal recorder
+        if not recorder: return
+        os.makedirs(MOVIE_DIR, exist_ok=True)
+        name = os.path.splitext(os.path.basename(chip8_instance.current_rom_path))[0]
+        path = recorder.stop(os.path.join(MOVIE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.c8m"))
+        recorder = None
+        update_caption()
+        print(f"Recording saved to {path}{reason}")
+
+    def stop_capture():
+        nonlocal capture
+        if not capture: return
+        path = capture.stop()
+        capture = None
+        update_caption()
+        print(f"Capture saved to {path}")
+
+    def stop_profiler():
+        nonlocal profiler
+        if not profiler: return
+        profiler.detach()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = os.path.splitext(os.path.basename(chip8_instance.current_rom_path))[0]
+        path = profiler.export(os.path.join(PROFILE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+        profiler = None
+        screen_chip8.force_redraw() # Paint over the overlay
+        print(f"Profile saved to {path}")
+
+    def push_rewind():
+        try:
+            rewind.push(chip8_instance.get_snapshot())
+        except ValueError: # Runaway stack, too deep for a snapshot
+            rewind.clear()
+
+    def emulate(dt):
+        if paused: return
+
+        # Step back one frame per tick while rewinding
+        if rewinding:
+            snapshot = rewind.pop()
+            if snapshot: chip8_instance.load_snapshot(snapshot)
+            scheduler.reset()
+            if capture: capture.add(chip8_instance)
+
+        # Fast forward: whole frames for most of this tick, one rewind point per displayed frame
+        elif fast_forward:
+            scheduler.fast_forward(chip8_instance)
+            push_rewind()
+            if capture: capture.add(chip8_instance) # As shown, so fast forward plays sped up in the capture
+
+        # Frames due since the last tick (fractional IPS budget, capped catch-up)
+        else:
+            for _ in range(scheduler.frames_due(dt)):
+                scheduler.run_frame(chip8_instance)
+                push_rewind()
+                if capture: capture.add(chip8_instance)
+
+    # Threaded mode: emulate() runs on its own thread and this loop only handles input and draws the
+    # newest published frame. Otherwise both happen here, one after the other
+    core = CoreThread(chip8_instance, emulate) if THREADED else None
+    core_lock = core.lock if core else nullcontext()
+    press = core.set_key if core else chip8_instance.set_key
+    screen_chip8 = core.view if core else chip8_instance # What gets drawn
+    if core: core.start()
+
+    used_slots = [str(slot['slot']) for slot in sm.get_save_slots(chip8_instance.rom_hash)]
+    if used_slots: print(f"Save slots for this ROM: {', '.join(used_slots)}")
     
     while running:
         dt = clock.tick(60) / 1000.0
+        frame_start = time.perf_counter()
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -58,48 +209,120 @@ def main(chip8_instance, config):
                 mods = pygame.key.get_mods()
                 is_ctrl = (mods & pygame.KMOD_CTRL)
                 
-                # RESET HOTKEY (Ctrl + R)
-                if event.key == pygame.K_r and is_ctrl:
-                    if hasattr(chip8_instance, 'current_rom_path'):
-                        path = chip8_instance.current_rom_path
-                        chip8_instance.__init__() 
-                        chip8_instance.load_rom(path)
-                        print("Emulator Reset")
+                # Standard Keypad
+                if event.key in mapping and not is_ctrl:
+                    press(mapping[event.key], True)
                     continue
+
+                # Hotkeys below change the machine itself, so in threaded mode they wait for the core between steps
+                with core_lock:
+                    # RESET HOTKEY (Ctrl + R)
+                    if event.key == pygame.K_r and is_ctrl:
+                        if hasattr(chip8_instance, 'current_rom_path'):
+                            stop_recording(" (stopped by reset)")
+                            path = chip8_instance.current_rom_path
+                            chip8_instance.__init__() 
+                            chip8_instance.jit_enabled = JIT
+                            chip8_instance.set_quirks(ACTIVE_QUIRKS)
+                            chip8_instance.load_rom(path)
+                            rewind.clear()
+                            print("Emulator Reset")
+                        continue
                 
-                # QUICK SAVE (Ctrl + S)
-                elif event.key == pygame.K_s and is_ctrl:
-                    saved_state = chip8_instance.get_snapshot()
-                    print("Quick Save Created!")
+                    # SELECT SAVE SLOT (Ctrl + 1-9)
+                    elif pygame.K_1 <= event.key <= pygame.K_9 and is_ctrl:
+                        save_slot = event.key - pygame.K_0
+                        update_caption()
+
+                    # QUICK SAVE (Ctrl + S) to the current slot on disk
+                    elif event.key == pygame.K_s and is_ctrl:
+                        try:
+                            sm.save_state(chip8_instance.rom_hash, save_slot, chip8_instance.get_snapshot())
+                            print(f"Quick Save Created! (Slot {save_slot})")
+                        except (ValueError, OSError) as e:
+                            print(f"Quick Save Failed: {e}")
                 
-                # QUICK LOAD (Ctrl + L)
-                elif event.key == pygame.K_l and is_ctrl:
-                    if saved_state:
-                        chip8_instance.load_snapshot(saved_state)
-                        print("Quick Save Loaded!")
+                    # QUICK LOAD (Ctrl + L) from the current slot
+                    elif event.key == pygame.K_l and is_ctrl:
+                        try:
+                            saved_state = sm.load_state(chip8_instance.rom_hash, save_slot)
+                            if saved_state:
+                                stop_recording(" (stopped by quick load)")
+                                chip8_instance.load_snapshot(saved_state)
+                                print(f"Quick Save Loaded! (Slot {save_slot})")
+                            else:
+                                print(f"Slot {save_slot} is empty")
+                        except (ValueError, OSError) as e:
+                            print(f"Quick Load Failed: {e}")
                     
-                elif event.key == pygame.K_p and is_ctrl:
-                    paused = not paused
-                    caption = f"CHIP-8 | Profile: {config['name']}"
-                    pygame.display.set_caption(caption + (" [PAUSED]" if paused else ""))
-                    continue
-                
-                # Standard Keypad
-                if event.key in mapping and not is_ctrl:
-                    chip8_instance.keypad[mapping[event.key]] = 1
+                    elif event.key == pygame.K_p and is_ctrl:
+                        paused = not paused
+                        update_caption()
+                        continue
+
+                    # RECORD INPUT MOVIE (Ctrl + M) for deterministic replay with Movie.py
+                    elif event.key == pygame.K_m and is_ctrl:
+                        if recorder:
+                            stop_recording()
+                        else:
+                            try:
+                                recorder = MovieRecorder(chip8_instance)
+                                update_caption()
+                                print("Recording Started")
+                            except ValueError as e:
+                                print(f"Recording Failed: {e}")
+
+                    # CAPTURE GAMEPLAY (Ctrl + G) to an animated GIF in /CAPTURES, encoded on a background thread
+                    elif event.key == pygame.K_g and is_ctrl:
+                        if capture:
+                            stop_capture()
+                        else:
+                            os.makedirs(CAPTURE_DIR, exist_ok=True)
+                            name = os.path.splitext(os.path.basename(chip8_instance.current_rom_path))[0]
+                            path = os.path.join(CAPTURE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.gif")
+                            capture = Capture(path, chip8_instance, BG_COLOR, FG_COLOR)
+                            update_caption()
+                            print("Capture Started")
+
+                    # PROFILER (Ctrl + I) opcode/PC counters and frame timings, saved to /PROFILES as JSON when stopped
+                    elif event.key == pygame.K_i and is_ctrl:
+                        if profiler:
+                            stop_profiler()
+                        else:
+                            profiler = Profiler(chip8_instance)
+                            print("Profiling Started")
+
+                    # REWIND (hold Backspace)
+                    elif event.key == pygame.K_BACKSPACE:
+                        stop_recording(" (stopped by rewind)")
+                        rewinding = True
+
+                    # FAST FORWARD (hold Tab) as fast as the CPU allows
+                    elif event.key == pygame.K_TAB:
+                        fast_forward = True
+                        update_caption()
+
             
             if event.type == pygame.KEYUP:
                 if event.key in mapping:
-                    chip8_instance.keypad[mapping[event.key]] = 0
-
-        # Time Step Accumulator
-        if not paused:
-            accumulator += dt
-            while accumulator >= (1.0 / 60.0):
-                for _ in range(IPS // 60):
-                    chip8_instance.cycle()
-                chip8_instance.update_timers()
-                accumulator -= (1.0 / 60.0)
+                    press(mapping[event.key], False)
+                elif event.key == pygame.K_BACKSPACE:
+                    rewinding = False
+                elif event.key == pygame.K_TAB:
+                    fast_forward = False
+                    update_caption()
+
+            # Window was covered/restored, dirty-rect updates alone won't repaint it
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                screen_chip8.force_redraw()
+
+        events_done = time.perf_counter()
+        if core: core.update_view()
+        else: emulate(dt)
+        emulate_done = time.perf_counter()
+        if scheduler.stats_due():
+            with core_lock: scheduler.poll_stats() # The core thread bumps the counters in threaded mode
+            update_caption()
         
         current_fg = FG_COLOR
         if RAINBOW:
@@ -108,26 +331,40 @@ def main(chip8_instance, config):
             rainbow_color.hsla = (hue, 100, 50, 100)
             current_fg = (rainbow_color.r, rainbow_color.g, rainbow_color.b)
 
-        # Rendering
-        screen.fill(BG_COLOR)
-        chip8_instance.draw(screen, SCALE, BG_COLOR, current_fg, CRT)
-        pygame.display.flip()
+        # Rendering (only rows that changed, nothing at all on idle frames). Hires games get smaller pixels
+        scale = SCREEN_WIDTH // screen_chip8.width
+        dirty_rects = screen_chip8.draw(screen, scale, BG_COLOR, current_fg, CRT)
+
+        if profiler:
+            emulate_time = core.step_time if core else emulate_done - events_done
+            profiler.add_frame(emulate_time, time.perf_counter() - emulate_done, events_done - frame_start)
+            if overlay_font is None: overlay_font = pygame.font.SysFont("monospace", 14)
+            overlay = profiler.draw_overlay(screen, overlay_font)
+            dirty_rects.append(overlay)
+            screen_chip8.dirty_rows |= (1 << min(screen_chip8.height, -(-overlay.bottom // scale))) - 1 # Repaint under it next frame
+
+        if dirty_rects: pygame.display.update(dirty_rects)
 
-        # Audio
-        if config["audio"] == 1 and not paused:
-            if chip8_instance.sound_timer > 0: beep.play()
-            else: beep.stop()
+        # Audio (the beeper only reacts when this changes, the tone itself loops in the mixer)
+        beeper.update(config["audio"] == 1 and not paused and chip8_instance.sound_timer > 0)
 
-    pygame.quit()
+    if core: core.stop()
+    stop_recording()
+    stop_capture()
+    stop_profiler()
+    hide_game_window()
 
 #------------LOAD ROM LOGIC-----------#
-def load_rom_wrapper(chip8_instance, full_path, root):
+def load_rom_wrapper(full_path, root):
     def wrap():
         try:
+            chip8_instance = core_for_rom(full_path) # SUPER-CHIP / XO-CHIP files get the extended core
             chip8_instance.load_rom(full_path)
+            root.chip8 = chip8_instance
             root.selected_config = sm.get_rom_settings(full_path) #Load settings for this ROM
             root.game_selected = True
-            root.destroy()
+            root.withdraw() # Kept for the next visit, see load_rom_screen
+            root.quit()
         except Exception as e:
             messagebox.showerror("Error", f"Could not load ROM: {e}")
     return wrap
@@ -140,7 +377,7 @@ def set_rom_profile(rom_path, profile_name):
 def open_settings_editor(root, refresh_callback):
     editor = tk.Toplevel(root)
     editor.title("Profile Manager")
-    editor.geometry("350x550")
+    editor.geometry("350x800")
     
     #-----CREATE/EDIT SECTION------
     tk.Label(editor, text="CREATE OR EDIT PROFILE", font=("Arial", 10, "bold")).pack(pady=10)
@@ -178,10 +415,32 @@ def open_settings_editor(root, refresh_callback):
     rainbow_var = tk.BooleanVar(value=False)
     tk.Checkbutton(editor, text="Rainbow Mode", variable=rainbow_var).pack(pady=5)
 
+    jit_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(editor, text="Fast Mode (Block Compiler)", variable=jit_var).pack(pady=5)
+
+    threaded_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(editor, text="Threaded Core (emulate apart from drawing)", variable=threaded_var).pack(pady=5)
+
+    # Compatibility quirks, for ROMs written against other interpreters (all off = modern behaviour)
+    quirk_labels = {
+        "shift": "8XY6/8XYE shift VY (COSMAC)",
+        "memory": "FX55/FX65 advance I (COSMAC)",
+        "jump": "BNNN jumps to XNN + VX (SUPER-CHIP)",
+        "clip": "Sprites clip at the screen edge",
+        "vf_reset": "8XY1/2/3 reset VF (COSMAC)",
+    }
+    quirk_frame = tk.LabelFrame(editor, text="Quirks")
+    quirk_frame.pack(fill="x", padx=20, pady=5)
+    quirk_vars = {}
+    for name in QUIRKS:
+        quirk_vars[name] = tk.BooleanVar(value=False)
+        tk.Checkbutton(quirk_frame, text=quirk_labels[name], variable=quirk_vars[name]).pack(anchor="w")
+
     # Update the save button command to include rainbow_var.get()
     def save():
         sm.save_profile(name_var.get(), bg_var.get(), fg_var.get(), 
-                        crt_var.get(), ips_var.get(), audio_var.get(), rainbow_var.get())
+                        crt_var.get(), ips_var.get(), audio_var.get(), rainbow_var.get(), jit_var.get(),
+                        threaded_var.get(), [name for name, var in quirk_vars.items() if var.get()])
         messagebox.showinfo("Success", "Profile saved!")
         refresh_callback()
         editor.destroy()
@@ -212,99 +471,54 @@ def open_settings_editor(root, refresh_callback):
         tk.Label(editor, text="No custom profiles to delete", fg="grey").pack()
 
 #-----------ROM SELECTION SCREEN----------#
-def create_rom_row(parent, filename, path, chip8, root, favorites, profile_options):
-    frame = tk.Frame(parent)
-    frame.pack(fill="x", padx=10, pady=2)
-    
-    is_fav = path in favorites
-    fav_text = "★" if is_fav else "☆"
-    fav_color = "orange" if is_fav else "black"
-    
-    # Profile Dropdown
-    current_setting = sm.get_rom_settings(path)["name"]
-    var = tk.StringVar(value=current_setting)
+library_root = None # The library window, built once and withdrawn while a game runs
 
-    dropdown = tk.OptionMenu(frame, var, *profile_options, command=lambda val, p=path: set_rom_profile(p, val))
-    dropdown.config(width=10)
-    dropdown.pack(side="right")
-    
-    # Favorite Button
-    # Note: We reload the screen by returning "RELOAD" so we don't nest mainloops
-    fav_btn = tk.Button(frame, text=fav_text, fg=fav_color, width=3, 
-                        command=lambda: [sm.toggle_favorite(path), root.event_generate("<<ReloadUI>>")])
-    fav_btn.pack(side="left")
+def load_rom_screen():
+    global library_root
+    if library_root is None:
+        library_root = create_library_window()
+        library_root.after_idle(report_startup)
+
+    root = library_root
+    root.chip8 = None # Set to the loaded core by the pick
+    root.game_selected = False
+    root.selected_config = None
+    root.deiconify()
+    root.mainloop()
     
-    #ROM Load Button
-    btn = tk.Button(frame, text=filename, anchor="w", 
-                    command=load_rom_wrapper(chip8, path, root))
-    btn.pack(side="left", fill="x", expand=True)
+    #Return the core and config set by the wrapper
+    return root.chip8, root.selected_config
 
-def load_rom_screen(chip8_instance):
+def create_library_window():
     sm.init_db()
     
     root = tk.Tk()
     root.title("CHIP-8 Library")
     root.geometry("450x600")
     
-    root.game_selected = False
-    root.selected_config = None
+    root.library = rl.scan_library()
+
+    def rescan():
+        root.library = rl.scan_library(full=True)
+        build_ui()
 
     #------REFRESH LOGIC------
+    # Reloads the data into the list view (after a rescan or profile edits), the row widgets are reused
     def build_ui():
-        for widget in container.winfo_children():
-            widget.destroy()
-
-        # Canvas Setup
-        canvas = tk.Canvas(container)
-        scrollbar = tk.Scrollbar(container, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas)
-
-        scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        #Mousewheel
-        canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
-        
-        #Data Loading
         favorites = sm.get_favorites()
         profile_options = list(sm.get_profiles().keys())
 
-        #FAVORITES SECTION
-        if favorites:
-            tk.Label(scrollable_frame, text="FAVORITES", font=("Arial", 12, "bold"), fg="orange").pack(pady=(10, 2))
-            for path in favorites:
-                if os.path.exists(path):
-                    filename = os.path.basename(path)
-                    create_rom_row(scrollable_frame, filename, path, chip8_instance, root, favorites, profile_options)
-
-        #FOLDER SCANNING
-        rom_folder = "ROMS"
-        if not os.path.exists(rom_folder): os.makedirs(rom_folder)
-        
-        found_any = False
-        for item in sorted(os.listdir(rom_folder)):
-            dir_path = os.path.join(rom_folder, item)
-            
-            if os.path.isdir(dir_path):
-                files = [f for f in os.listdir(dir_path) if f.endswith(".ch8")]
-                if files:
-                    found_any = True
-                    tk.Label(scrollable_frame, text=item.upper(), font=("Arial", 10, "bold"), fg="blue").pack(pady=(10, 2))
-                    for file in sorted(files):
-                        path = os.path.join(dir_path, file)
-                        create_rom_row(scrollable_frame, file, path, chip8_instance, root, favorites, profile_options)
-            
-            elif item.endswith(".ch8"):
-                found_any = True
-                path = os.path.join(rom_folder, item)
-                create_rom_row(scrollable_frame, item, path, chip8_instance, root, favorites, profile_options)
-        
-        if not found_any and not favorites:
-             tk.Label(scrollable_frame, text="No ROMs found in /ROMS").pack(pady=20)
+        #LIBRARY (from the ROM index, ROMS/ is only rescanned on open or from the menu)
+        sections = rl.library_sections(root.library)
+        indexed = {row["path"] for row in root.library}
+
+        fav_paths = [path for path in favorites if path in indexed or os.path.exists(path)]
+        all_paths = fav_paths + [path for _, rows in sections for _, path in rows]
+        rom_settings = sm.get_rom_settings_map(all_paths)
+
+        library.set_library(sections, fav_paths, {path: settings["name"] for path, settings in rom_settings.items()},
+                            profile_options, {row["path"]: row["rom_hash"] for row in root.library})
+        library.add_thumbnails(thumbnails.request(root.library)) # Cached ones now, missing ones as they're rendered
 
     #-----MENU BAR-------
     menubar = tk.Menu(root)
@@ -314,31 +528,33 @@ def load_rom_screen(chip8_instance):
     
     #Passing build_ui as callback to refresh dropdowns after saving
     settings_menu.add_command(label="Profile Settings", command=lambda: open_settings_editor(root, build_ui))
+    settings_menu.add_command(label="Rescan ROMS", command=rescan)
 
     container = tk.Frame(root)
     container.pack(fill="both", expand=True)
 
-    #Event listener to reload UI (when favorite is clicked)
-    root.bind("<<ReloadUI>>", lambda e: build_ui())
+    #Virtualized ROM list, favourite and profile changes update its rows in place
+    library = LibraryList(container, on_load=lambda path: load_rom_wrapper(path, root)(),
+                          on_favorite=sm.toggle_favorite, on_profile=set_rom_profile)
+    thumbnails = ThumbnailCache(root, on_ready=library.add_thumbnails)
     
     build_ui() #Initial build
 
     #Exit logic
     def on_close():
+        thumbnails.stop()
         root.destroy()
+        shutdown()
         sys.exit()
     root.protocol("WM_DELETE_WINDOW", on_close)
-    
-    root.mainloop()
-    
-    #Return the config found by the wrapper
-    return root.selected_config
+
+    return root
 
 # --- MAIN ENTRY POINT ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Thumbnail pool workers in the pyinstaller exe run the worker, not the app
     while True:
-        chip8 = Chip8() 
-        config = load_rom_screen(chip8)
+        chip8, config = load_rom_screen()
         
         if config:
             main(chip8, config)
\ No newline at end of file
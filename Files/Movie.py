@@ -0,0 +1,171 @@
+import sys
+import time
+import zlib
+import random
+import struct
+import hashlib
+import argparse
+
+from Chip8_Emulator import QUIRKS
+from Chip8_Extended import core_for_snapshot
+
+#--------MOVIE FORMAT-----------#
+# Header: magic, RNG seed, keypad bitmask, quirk bitmask (bit n = nth QUIRKS name), start snapshot length,
+# then the start snapshot. C8M1 movies predate quirks and have no quirk field (all off).
+# Body: zlib'd event stream, each event is a varint cycle delta + one code byte.
+# Trailer (inside the stream, after END): SHA-1 of the final packed framebuffer.
+MOVIE_MAGIC = b"C8M2"
+MOVIE_HEADER = struct.Struct(">4sIHHI")
+LEGACY_MAGIC = b"C8M1"
+LEGACY_HEADER = struct.Struct(">4sIHI")
+
+KEY_UP = 0x00     # 0x00-0x0F: key released
+KEY_DOWN = 0x10   # 0x10-0x1F: key pressed
+TIMER_TICK = 0x20 # update_timers() ran
+END = 0xFF
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, pos
+        shift += 7
+
+def frame_hash(chip8_instance):
+    return hashlib.sha1(chip8_instance.framebuffer_bytes()).digest()
+
+#--------RECORDING-----------#
+class MovieRecorder:
+    # Attaches to a running Chip8: reseeds its RNG, snapshots the start state and logs every
+    # key change and timer tick against cycle_count until stop()
+    def __init__(self, chip8_instance, seed=None):
+        self.chip8 = chip8_instance
+        self.seed = random.getrandbits(32) if seed is None else seed
+        chip8_instance.rng.seed(self.seed)
+
+        keys = sum(1 << key for key, pressed in enumerate(chip8_instance.keypad) if pressed)
+        snapshot = chip8_instance.get_snapshot()
+        quirks = sum(1 << bit for bit, name in enumerate(QUIRKS) if name in chip8_instance.quirks)
+        self.header = MOVIE_HEADER.pack(MOVIE_MAGIC, self.seed, keys, quirks, len(snapshot)) + snapshot
+
+        self.events = bytearray()
+        self.last_cycle = chip8_instance.cycle_count
+        chip8_instance.recorder = self
+
+    def log(self, code):
+        cycle = self.chip8.cycle_count
+        write_varint(self.events, cycle - self.last_cycle)
+        self.events.append(code)
+        self.last_cycle = cycle
+
+    def key_change(self, key, pressed):
+        self.log((KEY_DOWN if pressed else KEY_UP) | key)
+
+    def timer_tick(self):
+        self.log(TIMER_TICK)
+
+    def stop(self, path):
+        # Detach and write the movie. The END event carries any cycles run since the last event
+        if self.chip8.recorder is self: self.chip8.recorder = None
+        self.log(END)
+        self.events += frame_hash(self.chip8)
+
+        with open(path, "wb") as f:
+            f.write(self.header)
+            f.write(zlib.compress(bytes(self.events), 9))
+        return path
+
+#--------REPLAY-----------#
+def read_movie(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] == LEGACY_MAGIC:
+        header = LEGACY_HEADER
+        magic, seed, keys, snapshot_len = header.unpack_from(data)
+        quirks = 0
+    else:
+        header = MOVIE_HEADER
+        magic, seed, keys, quirks, snapshot_len = header.unpack_from(data)
+    if magic != MOVIE_MAGIC and magic != LEGACY_MAGIC:
+        raise ValueError(f"{path} is not a CHIP-8 movie")
+
+    start = header.size
+    snapshot = data[start:start + snapshot_len]
+    events = zlib.decompress(data[start + snapshot_len:])
+    return seed, keys, [name for bit, name in enumerate(QUIRKS) if quirks >> bit & 1], snapshot, events
+
+def replay_movie(path, jit=False, on_frame=None):
+    # Runs the recording headless at full speed and checks the final frame against the recorded one.
+    # on_frame(chip8) is called after every timer tick (once per emulated frame), for Capture.py
+    seed, keys, quirks, snapshot, events = read_movie(path)
+
+    chip8 = core_for_snapshot(snapshot)
+    chip8.jit_enabled = jit
+    chip8.set_quirks(quirks)
+    chip8.load_snapshot(snapshot)
+    chip8.rng.seed(seed)
+    chip8.keypad = [(keys >> key) & 1 for key in range(16)]
+
+    # Decode up front so the timed loop is only emulation
+    decoded = []
+    pos = 0
+    while True:
+        delta, pos = read_varint(events, pos)
+        code = events[pos]
+        pos += 1
+        decoded.append((delta, code))
+        if code == END: break
+    expected_hash = events[pos:pos + 20]
+
+    run = chip8.run
+    set_key = chip8.set_key
+    start = time.perf_counter()
+    for delta, code in decoded:
+        if delta: run(delta)
+        if code == TIMER_TICK:
+            chip8.update_timers()
+            if on_frame: on_frame(chip8)
+        elif code < KEY_DOWN: set_key(code, 0)
+        elif code < TIMER_TICK: set_key(code - KEY_DOWN, 1)
+    elapsed = time.perf_counter() - start
+
+    cycles = sum(delta for delta, code in decoded)
+    executed = cycles - chip8.idle_cycles # Idle loop skips aren't executed instructions
+    final_hash = frame_hash(chip8)
+    return {
+        "movie": path,
+        "cycles": cycles,
+        "idle_cycles": chip8.idle_cycles,
+        "frames": sum(1 for delta, code in decoded if code == TIMER_TICK),
+        "seconds": elapsed,
+        "cycles_per_sec": executed / elapsed if elapsed > 0 else 0.0,
+        "frame_hash": final_hash.hex(),
+        "matches_recording": final_hash == expected_hash,
+    }
+
+#--------CLI-----------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay CHIP-8 input recordings (.c8m) headless at full speed.")
+    parser.add_argument("movies", nargs="+", help="Movie files recorded with Ctrl + M")
+    parser.add_argument("--jit", action="store_true", help="Use the block compiler")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.movies:
+        res = replay_movie(path, jit=args.jit)
+        status = "OK" if res["matches_recording"] else "MISMATCH"
+        print(f"{path}: {res['frames']} frames, {res['cycles']:,} cycles in {res['seconds']:.2f}s "
+              f"({res['cycles_per_sec']:,.0f} cycles/s), frame {res['frame_hash'][:12]} {status}")
+        failed |= not res["matches_recording"]
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
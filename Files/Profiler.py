@@ -0,0 +1,172 @@
+import json
+import time
+from collections import deque
+
+from Chip8_Emulator import OPCODE_TABLE, opcode_key
+from Chip8_Extended import Chip8Extended, EXTENDED_TABLE, extended_key
+
+def family_labels(table):
+    return {key: ("DXYN" if name == "draw_sprite" else name[4:].upper()) for key, (name, fields) in table.items()}
+
+# Opcode family label per table key, e.g. 0x8004 -> "8XY4" (EXTENDED_FAMILIES by extended_key, e.g. 0x00C0 -> "00CN")
+FAMILIES = family_labels(OPCODE_TABLE)
+EXTENDED_FAMILIES = family_labels(EXTENDED_TABLE)
+OVERLAY_REFRESH = 0.5 # Seconds between overlay text updates
+
+#--------HELPERS-----------#
+def opcode_family(opcode, extended=False):
+    # extended: label SUPER-CHIP / XO-CHIP instructions too, for a Chip8Extended core
+    if extended: return EXTENDED_FAMILIES.get(extended_key(opcode), "????")
+    return FAMILIES.get(opcode_key(opcode), "????")
+
+def percentile(values, fraction):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timing_summary(values):
+    # Seconds -> milliseconds summary
+    if not values: return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+#--------PROFILER-----------#
+class Profiler:
+    # Instruments one Chip8 by shadowing its cycle/run/predecode with counting versions on the instance.
+    # detach() removes them again, so an unprofiled Chip8 runs the plain class methods and pays nothing.
+    # Profiled runs always go through cycle(), the block compiler is bypassed while attached
+    def __init__(self, chip8_instance, frame_history=600):
+        self.chip8 = chip8_instance
+        self.opcode_hits = [0] * 0x10000 # Raw opcode -> executions, folded into families by report()
+        self.pc_hits = [0] * len(chip8_instance.memory)
+        self.decodes = 0                 # Decode cache misses (first visits and self-modified code)
+        self.idle_start = chip8_instance.idle_cycles # Skipped idle instructions aren't in the hit counts
+        self.frames = deque(maxlen=frame_history) # (emulate, draw, events) seconds per Main.main frame
+        self.started = time.perf_counter()
+
+        self.overlay = None
+        self.overlay_time = 0.0
+        self.overlay_count = 0
+        self.attach()
+
+    def attach(self):
+        chip8 = self.chip8
+        cycle = chip8.cycle
+        run = chip8.run
+        predecode = chip8.predecode
+        opcode_hits = self.opcode_hits
+        pc_hits = self.pc_hits
+
+        def profiled_cycle():
+            pc = chip8.pc
+            memory = chip8.memory
+            pc_hits[pc] += 1
+            opcode_hits[(memory[pc] << 8) | memory[pc + 1]] += 1
+            return cycle()
+
+        def profiled_run(cycles):
+            # The class run() (idle skipping included) with the block compiler off, so it calls profiled_cycle
+            jit = chip8.jit_enabled
+            chip8.jit_enabled = False
+            try: run(cycles)
+            finally: chip8.jit_enabled = jit
+
+        def profiled_predecode(opcode):
+            self.decodes += 1
+            return predecode(opcode)
+
+        chip8.cycle = profiled_cycle
+        chip8.run = profiled_run
+        chip8.predecode = profiled_predecode
+
+    def detach(self):
+        for name in ("cycle", "run", "predecode"):
+            self.chip8.__dict__.pop(name, None)
+
+    def add_frame(self, emulate, draw, events):
+        self.frames.append((emulate, draw, events))
+
+    #------REPORTING------
+    def instructions(self):
+        return sum(self.pc_hits)
+
+    def family_counts(self):
+        counts = {}
+        extended = isinstance(self.chip8, Chip8Extended)
+        for opcode, hits in enumerate(self.opcode_hits):
+            if hits:
+                family = opcode_family(opcode, extended)
+                counts[family] = counts.get(family, 0) + hits
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+    def hot_pcs(self, top=16):
+        ranked = sorted((hits, pc) for pc, hits in enumerate(self.pc_hits) if hits)
+        return [(pc, hits) for hits, pc in reversed(ranked[-top:])]
+
+    def report(self, top=16):
+        elapsed = time.perf_counter() - self.started
+        total = self.instructions()
+        memory = self.chip8.memory
+        share = lambda hits: hits / total if total else 0.0
+
+        return {
+            "rom": self.chip8.current_rom_path,
+            "rom_hash": self.chip8.rom_hash,
+            "seconds": elapsed,
+            "instructions": total,
+            "ips": total / elapsed if elapsed > 0 else 0.0,
+            "decodes": self.decodes,
+            "idle_cycles": self.chip8.idle_cycles - self.idle_start,
+            "opcodes": [{"family": family, "count": hits, "share": share(hits)} for family, hits in self.family_counts()],
+            "hot_pcs": [{"pc": f"0x{pc:03X}", "opcode": f"0x{(memory[pc] << 8) | memory[(pc + 1) % len(memory)]:04X}",
+                         "count": hits, "share": share(hits)} for pc, hits in self.hot_pcs(top)],
+            "frames": {
+                "count": len(self.frames),
+                "emulate": timing_summary([frame[0] for frame in self.frames]),
+                "draw": timing_summary([frame[1] for frame in self.frames]),
+                "events": timing_summary([frame[2] for frame in self.frames]),
+            },
+        }
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    #------OVERLAY------
+    def draw_overlay(self, surface, font):
+        # Blits the stats box in the top left corner and returns its rect. The text is re-rendered
+        # every OVERLAY_REFRESH seconds, in between the cached surface is reused
+        import pygame
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time >= OVERLAY_REFRESH:
+            total = self.instructions()
+            ips = (total - self.overlay_count) / (now - self.overlay_time) if self.overlay else 0.0
+            self.overlay_time = now
+            self.overlay_count = total
+
+            recent = list(self.frames)[-60:]
+            avg = lambda n: sum(frame[n] for frame in recent) / len(recent) * 1000 if recent else 0.0
+            families = self.family_counts()[:4]
+            lines = [
+                f"PROFILING  {ips:,.0f} IPS  decodes {self.decodes:,}",
+                f"emu {avg(0):.2f} ms  draw {avg(1):.2f} ms  events {avg(2):.2f} ms",
+                "  ".join(f"{family} {hits / total:.0%}" for family, hits in families) if total else "",
+                "hot " + "  ".join(f"{pc:03X}" for pc, hits in self.hot_pcs(4)),
+            ]
+
+            rendered = [font.render(line, True, (255, 255, 255)) for line in lines]
+            width = max(text.get_width() for text in rendered) + 8
+            height = sum(text.get_height() for text in rendered) + 8
+            self.overlay = pygame.Surface((width, height))
+            self.overlay.set_alpha(200)
+            y = 4
+            for text in rendered:
+                self.overlay.blit(text, (4, y))
+                y += text.get_height()
+
+        return surface.blit(self.overlay, (0, 0))
@@ -0,0 +1,68 @@
+import zlib
+from collections import deque
+
+#--------HELPERS-----------#
+def xor_bytes(a, b):
+    # Equal-length blobs; mostly zeros when two snapshots are close, which zlib squeezes to almost nothing
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(len(a), "big")
+
+#--------REWIND BUFFER-----------#
+class RewindBuffer:
+    # Ring buffer of per-frame snapshots. Every keyframe_interval frames a full (compressed) keyframe
+    # starts a new group, the frames after it are stored as compressed XOR deltas against it.
+    # Once max_bytes is exceeded the oldest groups are dropped, so memory use stays capped.
+    def __init__(self, max_bytes=16 * 1024 * 1024, keyframe_interval=60):
+        self.max_bytes = max_bytes
+        self.keyframe_interval = keyframe_interval
+        self.clear()
+
+    def clear(self):
+        self.groups = deque() # Each group is [compressed keyframe, [compressed deltas]]
+        self.keyframe = None  # Uncompressed keyframe of the newest group
+        self.size = 0
+        self.frames = 0
+
+    def __len__(self):
+        return self.frames
+
+    def current_keyframe(self):
+        if self.keyframe is None:
+            self.keyframe = zlib.decompress(self.groups[-1][0])
+        return self.keyframe
+
+    def push(self, snapshot):
+        if not self.groups or len(self.groups[-1][1]) >= self.keyframe_interval - 1:
+            entry = zlib.compress(snapshot, 1)
+            self.groups.append([entry, []])
+            self.keyframe = snapshot
+        else:
+            entry = zlib.compress(xor_bytes(snapshot, self.current_keyframe()), 1)
+            self.groups[-1][1].append(entry)
+
+        self.size += len(entry)
+        self.frames += 1
+
+        # Always keep the newest group, even if a single group is over budget
+        while self.size > self.max_bytes and len(self.groups) > 1:
+            keyframe, deltas = self.groups.popleft()
+            self.size -= len(keyframe) + sum(len(delta) for delta in deltas)
+            self.frames -= 1 + len(deltas)
+
+    def pop(self):
+        # Newest snapshot, removed from the buffer. None once everything has been rewound
+        if not self.groups:
+            return None
+
+        keyframe = self.current_keyframe()
+        deltas = self.groups[-1][1]
+        if deltas:
+            entry = deltas.pop()
+            snapshot = xor_bytes(zlib.decompress(entry), keyframe)
+        else:
+            entry = self.groups.pop()[0]
+            snapshot = keyframe
+            self.keyframe = None
+
+        self.size -= len(entry)
+        self.frames -= 1
+        return snapshot
@@ -0,0 +1,94 @@
+import os
+import hashlib
+
+import SettingsManager as sm
+
+ROM_FOLDER = "ROMS"
+ROM_EXTENSIONS = (".ch8", ".sc8", ".xo8")
+
+#--------HELPERS-----------#
+def hash_file(path):
+    # Same SHA-1 as Chip8.load_rom, so index entries match save states
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def rom_key(row):
+    # Library order: loose ROMs and folders sorted together by name, then files within a folder
+    return (row["folder"] or os.path.basename(row["path"]), os.path.basename(row["path"]))
+
+#--------INCREMENTAL SCAN-----------#
+def scan_library(rom_folder=ROM_FOLDER, full=False):
+    # Returns the index rows for every ROM in rom_folder and its subfolders (one level, like the library UI).
+    # Adding, removing or renaming a file bumps its folder's mtime, so folders with an unchanged mtime are
+    # not listed again, their indexed files are only stat'ed (an edit in place leaves the folder mtime alone).
+    # In every folder only files whose size or mtime changed are re-hashed. full=True re-lists everything
+    if not os.path.exists(rom_folder): os.makedirs(rom_folder)
+
+    old_roms = sm.get_rom_index()
+    old_dirs = sm.get_dir_index()
+    roms_by_dir = {}
+    for row in old_roms.values():
+        roms_by_dir.setdefault(os.path.dirname(row["path"]), []).append(row)
+
+    roms = {}
+    dirs = {}
+
+    def scan_dir(dir_path, parent, folder):
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        dirs[dir_path] = {"path": dir_path, "parent": parent, "mtime_ns": mtime_ns}
+        cached = old_dirs.get(dir_path)
+
+        if not full and cached and cached["mtime_ns"] == mtime_ns:
+            for row in roms_by_dir.get(dir_path, []):
+                try: st = os.stat(row["path"])
+                except FileNotFoundError: continue
+                index_file(row["path"], folder, st)
+            return [path for path, entry in old_dirs.items() if entry["parent"] == dir_path]
+
+        subfolders = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if parent is None: subfolders.append(entry.path)
+                    continue
+                if not entry.name.endswith(ROM_EXTENSIONS): continue
+                index_file(entry.path, folder, entry.stat())
+        return subfolders
+
+    def index_file(path, folder, st):
+        row = old_roms.get(path)
+        if row and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns and row["folder"] == folder:
+            roms[path] = row
+        else:
+            roms[path] = {"path": path, "folder": folder, "size": st.st_size,
+                          "mtime_ns": st.st_mtime_ns, "rom_hash": hash_file(path)}
+
+    for dir_path in scan_dir(rom_folder, None, ""):
+        if os.path.isdir(dir_path): scan_dir(dir_path, rom_folder, os.path.basename(dir_path))
+
+    # Moved/renamed ROMs: a vanished path and a new path with the same content keep their favorite and profile
+    removed = [path for path in old_roms if path not in roms]
+    removed_by_hash = {old_roms[path]["rom_hash"]: path for path in removed}
+    for path, row in roms.items():
+        if path not in old_roms and row["rom_hash"] in removed_by_hash:
+            sm.move_rom_path(removed_by_hash.pop(row["rom_hash"]), path)
+
+    sm.update_rom_index([row for path, row in roms.items() if old_roms.get(path) != row], removed,
+                        [entry for path, entry in dirs.items() if old_dirs.get(path) != entry],
+                        [path for path in old_dirs if path not in dirs])
+
+    return sorted(roms.values(), key=rom_key)
+
+def library_sections(roms):
+    # Groups scan_library rows into (header, [(filename, path)]) the way the library screen lists them,
+    # header is None for loose ROMs
+    sections = []
+    for row in roms:
+        filename = os.path.basename(row["path"])
+        if not row["folder"]:
+            sections.append((None, [(filename, row["path"])]))
+        elif sections and sections[-1][0] == row["folder"].upper():
+            sections[-1][1].append((filename, row["path"]))
+        else:
+            sections.append((row["folder"].upper(), [(filename, row["path"])]))
+    return sections
@@ -0,0 +1,88 @@
+import time
+
+FRAME_TIME = 1.0 / 60.0    # Timers tick once per emulated frame
+MAX_CATCHUP_FRAMES = 5     # Frames emulated in one loop after a stall before the backlog is dropped
+FAST_FORWARD_SLICE = 0.012 # Seconds of emulation per displayed frame while fast-forwarding
+STATS_INTERVAL = 1.0
+
+#--------FRAME SCHEDULER-----------#
+class FrameScheduler:
+    # Turns wall-clock time into 60 Hz frames and each frame into an instruction budget.
+    # The fractional part of ips / 60 carries over (700 IPS runs 11, 12, 12, 11... = exactly 700 a second),
+    # catch-up after a stall is capped, and fast_forward() runs whole frames for as long as it's given
+    def __init__(self, ips, max_catchup=MAX_CATCHUP_FRAMES):
+        self.ips = ips
+        self.max_catchup = max_catchup
+        self.cycle_budget = 0   # Leftover instructions carried into the next frame, in 1/60ths
+        self.accumulator = 0.0  # Wall time not yet emulated
+        self.dropped_frames = 0
+
+        # Measured over the last STATS_INTERVAL (see poll_stats)
+        self.measured_ips = 0.0
+        self.speed = 0.0 # Emulated frames per real frame, 1.0 = full speed
+        self.idle_share = 0.0 # Fraction of instructions skipped as idle loops (see Chip8.check_idle)
+        self.cycles_run = 0
+        self.idle_run = 0
+        self.frames_run = 0
+        self.stats_start = time.perf_counter()
+
+    def reset(self):
+        # Forget pending time (paused, rewinding), the next frame starts fresh
+        self.accumulator = 0.0
+
+    def cycles_for_frame(self):
+        # Integer maths so nothing drifts: every 60 frames run exactly ips instructions
+        cycles, self.cycle_budget = divmod(self.cycle_budget + self.ips, 60)
+        return cycles
+
+    def frames_due(self, dt):
+        self.accumulator += dt
+        frames = int(self.accumulator / FRAME_TIME)
+        if frames > self.max_catchup:
+            # Too far behind (window dragged, slow disk, debugger...): run a few frames and slow down
+            # rather than spiral trying to catch up on all of them
+            self.dropped_frames += frames - self.max_catchup
+            self.accumulator = 0.0
+            return self.max_catchup
+        self.accumulator -= frames * FRAME_TIME
+        return frames
+
+    def run_frame(self, chip8_instance):
+        cycles = self.cycles_for_frame()
+        idle = chip8_instance.idle_cycles
+        chip8_instance.run(cycles)
+        chip8_instance.update_timers()
+        self.cycles_run += cycles
+        self.idle_run += chip8_instance.idle_cycles - idle
+        self.frames_run += 1
+
+    def fast_forward(self, chip8_instance, seconds=FAST_FORWARD_SLICE):
+        # As many whole frames as fit in seconds, timers still tick once per ips / 60 instructions.
+        # Returns the number of frames run
+        self.accumulator = 0.0
+        deadline = time.perf_counter() + seconds
+        frames = 0
+        while True:
+            self.run_frame(chip8_instance)
+            frames += 1
+            if time.perf_counter() >= deadline: return frames
+
+    def stats_due(self):
+        # Cheap check with no counters read, so a threaded caller only takes the core lock when poll_stats will refresh
+        return time.perf_counter() - self.stats_start >= STATS_INTERVAL
+
+    def poll_stats(self):
+        # True when measured_ips and speed were just refreshed (once per STATS_INTERVAL).
+        # The counters belong to whoever runs the frames, in threaded mode call this under the core lock
+        now = time.perf_counter()
+        elapsed = now - self.stats_start
+        if elapsed < STATS_INTERVAL: return False
+
+        self.measured_ips = self.cycles_run / elapsed
+        self.speed = self.frames_run * FRAME_TIME / elapsed
+        self.idle_share = self.idle_run / self.cycles_run if self.cycles_run else 0.0
+        self.cycles_run = 0
+        self.idle_run = 0
+        self.frames_run = 0
+        self.stats_start = now
+        return True
@@ -1,9 +1,36 @@
 import sqlite3
+import atexit
+import json
+import os
+import time
 
 DB_FILE = "settings.db"
+SAVE_DIR = "SAVES"
+QUIRK_COLUMNS = ("quirk_shift", "quirk_memory", "quirk_jump", "quirk_clip", "quirk_vf_reset") # quirk_ + Chip8_Emulator.QUIRKS names
+
+# --- CONNECTION ---
+# One connection for the whole app. sqlite3 keeps a per-connection cache of prepared
+# statements, so reusing it also means each query below is only compiled once
+_conn = None
+
+def get_connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_FILE, cached_statements=256)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")   # Readers never wait on the writer
+        _conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL, far fewer fsyncs
+        atexit.register(close_db)
+    return _conn
+
+def close_db():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # 1. PROFILES TABLE (Updated Schema)
@@ -16,16 +43,24 @@ def init_db():
             crt_enabled INTEGER,
             ips INTEGER,
             audio INTEGER,
-            rainbow_enabled INTEGER DEFAULT 0
+            rainbow_enabled INTEGER DEFAULT 0,
+            jit_enabled INTEGER DEFAULT 0,
+            threaded_enabled INTEGER DEFAULT 0,
+            quirk_shift INTEGER DEFAULT 0,
+            quirk_memory INTEGER DEFAULT 0,
+            quirk_jump INTEGER DEFAULT 0,
+            quirk_clip INTEGER DEFAULT 0,
+            quirk_vf_reset INTEGER DEFAULT 0
         )
     """)
 
-    # --- MIGRATION: Add column if it doesn't exist in an old DB ---
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN rainbow_enabled INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        # If the column already exists, SQLite throws an error; we just ignore it
-        pass
+    # --- MIGRATION: Add columns if they don't exist in an old DB ---
+    for column in ("rainbow_enabled", "jit_enabled", "threaded_enabled") + QUIRK_COLUMNS:
+        try:
+            cursor.execute(f"ALTER TABLE profiles ADD COLUMN {column} INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            # If the column already exists, SQLite throws an error; we just ignore it
+            pass
     
     # 2. ROM-PROFILE LINKS
     cursor.execute("""
@@ -38,6 +73,45 @@ def init_db():
 
     # 3. FAVORITES TABLE
     cursor.execute("CREATE TABLE IF NOT EXISTS favorites (path TEXT PRIMARY KEY)")
+
+    # 4. SAVE STATE INDEX (state files live in SAVE_DIR, keyed by ROM content hash)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS save_states (
+            rom_hash TEXT,
+            slot INTEGER,
+            file TEXT,
+            size INTEGER,
+            saved_at REAL,
+            PRIMARY KEY (rom_hash, slot)
+        )
+    """)
+
+    # 5. ROM LIBRARY INDEX (see RomLibrary.py), lets a rescan skip unchanged folders and files
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rom_index (
+            path TEXT PRIMARY KEY,
+            folder TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            rom_hash TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS rom_index_hash ON rom_index (rom_hash)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dir_index (
+            path TEXT PRIMARY KEY,
+            parent TEXT,
+            mtime_ns INTEGER
+        )
+    """)
+
+    # 6. ROM THUMBNAILS (see Thumbnails.py), keyed by content hash so an edited ROM gets a new one
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS thumbnails (
+            rom_hash TEXT PRIMARY KEY,
+            bitmap BLOB
+        )
+    """)
     
     # Ensure Default profile exists (Update columns here too)
     cursor.execute("SELECT * FROM profiles WHERE name='Default'")
@@ -48,108 +122,201 @@ def init_db():
         """, ("Default", "#0a140a", "#00ff00", 1, 700, 1, 0))
         
     conn.commit()
-    conn.close()
 
 # --- PROFILE LOGIC ---
 def get_profiles():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT * FROM profiles")
-    rows = cursor.fetchall()
-    conn.close()
-    return {row["name"]: dict(row) for row in rows}
+    return {row["name"]: dict(row) for row in cursor.fetchall()}
+
+def get_default_profile():
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT * FROM profiles WHERE name='Default'")
+    return dict(cursor.fetchone())
 
 def get_rom_settings(rom_path):
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     
-    # Find which profile this ROM uses
+    # Find which profile this ROM uses (LEFT JOIN so an unlinked ROM still costs one query)
     cursor.execute("""
         SELECT p.* FROM profiles p
-        JOIN rom_profiles r ON p.id = r.profile_id
-        WHERE r.rom_path = ?
+        LEFT JOIN rom_profiles r ON p.id = r.profile_id AND r.rom_path = ?
+        WHERE r.rom_path IS NOT NULL OR p.name = 'Default'
+        ORDER BY r.rom_path IS NULL
+        LIMIT 1
     """, (rom_path,))
     
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return dict(row)
-    
-    #Fallback to Default if no link exists
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM profiles WHERE name='Default'")
-    res = dict(cursor.fetchone())
-    conn.close()
-    return res
+    #Falls back to Default if no link exists
+    return dict(cursor.fetchone())
+
+def get_rom_settings_map(rom_paths):
+    # Bulk version of get_rom_settings: {rom_path: profile} for every path, from a single query.
+    # The paths go in as one JSON array parameter (no variable limit), the Default row comes back with linked_rom NULL
+    rom_paths = list(rom_paths)
+    cursor = get_connection().cursor()
+    cursor.execute("""
+        SELECT r.rom_path AS linked_rom, p.* FROM rom_profiles r
+        JOIN profiles p ON p.id = r.profile_id
+        WHERE r.rom_path IN (SELECT value FROM json_each(?))
+        UNION ALL
+        SELECT NULL, p.* FROM profiles p WHERE p.name = 'Default'
+    """, (json.dumps(rom_paths),))
+    linked = {}
+    default = None
+    for row in cursor.fetchall():
+        profile = dict(row)
+        path = profile.pop("linked_rom")
+        if path is None: default = profile
+        else: linked[path] = profile
+
+    # Each unlinked path gets its own copy, so editing one entry doesn't change them all
+    return {path: linked[path] if path in linked else dict(default) for path in rom_paths}
 
 def save_rom_profile_link(rom_path, profile_name):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM profiles WHERE name=?", (profile_name,))
-    pid = cursor.fetchone()[0]
-    cursor.execute("INSERT OR REPLACE INTO rom_profiles (rom_path, profile_id) VALUES (?, ?)", (rom_path, pid))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM profiles WHERE name=?", (profile_name,))
+        pid = cursor.fetchone()[0]
+        cursor.execute("INSERT OR REPLACE INTO rom_profiles (rom_path, profile_id) VALUES (?, ?)", (rom_path, pid))
 
-def save_profile(name, bg, fg, crt, ips, audio, rainbow):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO profiles (name, bg_color, fg_color, crt_enabled, ips, audio, rainbow_enabled)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+def save_profile(name, bg, fg, crt, ips, audio, rainbow, jit=False, threaded=False, quirks=()):
+    # quirks: the Chip8_Emulator.QUIRKS names to turn on for this profile
+    conn = get_connection()
+    with conn:
+        conn.execute(f"""
+        INSERT INTO profiles (name, bg_color, fg_color, crt_enabled, ips, audio, rainbow_enabled, jit_enabled, threaded_enabled,
+                              {", ".join(QUIRK_COLUMNS)})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in QUIRK_COLUMNS)})
         ON CONFLICT(name) DO UPDATE SET
             bg_color=excluded.bg_color,
             fg_color=excluded.fg_color,
             crt_enabled=excluded.crt_enabled,
             ips=excluded.ips,
             audio=excluded.audio,
-            rainbow_enabled=excluded.rainbow_enabled
-    """, (name, bg, fg, int(crt), ips, int(audio), int(rainbow)))
-    conn.commit()
-    conn.close()
+            rainbow_enabled=excluded.rainbow_enabled,
+            jit_enabled=excluded.jit_enabled,
+            threaded_enabled=excluded.threaded_enabled,
+            {", ".join(f"{column}=excluded.{column}" for column in QUIRK_COLUMNS)}
+    """, (name, bg, fg, int(crt), ips, int(audio), int(rainbow), int(jit), int(threaded),
+          *(int(column[len("quirk_"):] in quirks) for column in QUIRK_COLUMNS)))
 
 def delete_profile(name):
     if name == "Default":
         return False # Protect the default profile
     
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # 1. Find the ID
-    cursor.execute("SELECT id FROM profiles WHERE name=?", (name,))
-    result = cursor.fetchone()
-    if result:
-        pid = result[0]
-        # 2. Reset any ROMs using this profile back to 'Default' (ID 1)
-        cursor.execute("UPDATE rom_profiles SET profile_id = 1 WHERE profile_id = ?", (pid,))
-        # 3. Delete the profile
-        cursor.execute("DELETE FROM profiles WHERE id = ?", (pid,))
+    conn = get_connection()
+    with conn:
+        cursor = conn.cursor()
         
-    conn.commit()
-    conn.close()
+        # 1. Find the ID
+        cursor.execute("SELECT id FROM profiles WHERE name=?", (name,))
+        result = cursor.fetchone()
+        if result:
+            pid = result[0]
+            # 2. Reset any ROMs using this profile back to 'Default' (ID 1)
+            cursor.execute("UPDATE rom_profiles SET profile_id = 1 WHERE profile_id = ?", (pid,))
+            # 3. Delete the profile
+            cursor.execute("DELETE FROM profiles WHERE id = ?", (pid,))
     return True
 
 # --- FAVORITES LOGIC ---
 def toggle_favorite(path):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT path FROM favorites WHERE path = ?", (path,))
-    if cursor.fetchone():
-        cursor.execute("DELETE FROM favorites WHERE path = ?", (path,))
-    else:
-        cursor.execute("INSERT INTO favorites (path) VALUES (?)", (path,))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT path FROM favorites WHERE path = ?", (path,))
+        if cursor.fetchone():
+            cursor.execute("DELETE FROM favorites WHERE path = ?", (path,))
+        else:
+            cursor.execute("INSERT INTO favorites (path) VALUES (?)", (path,))
 
 def get_favorites():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT path FROM favorites")
-    favs = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return favs
\ No newline at end of file
+    return [row[0] for row in cursor.fetchall()]
+
+# --- SAVE STATE LOGIC ---
+def save_state(rom_hash, slot, data):
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    path = os.path.join(SAVE_DIR, f"{rom_hash}_{slot}.state")
+
+    # Write then rename, so a crash mid-save never leaves a half written slot
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO save_states (rom_hash, slot, file, size, saved_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (rom_hash, slot, path, len(data), time.time()))
+
+def load_state(rom_hash, slot):
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT file FROM save_states WHERE rom_hash = ? AND slot = ?", (rom_hash, slot))
+    row = cursor.fetchone()
+
+    if not row or not os.path.exists(row[0]):
+        return None
+    with open(row[0], "rb") as f:
+        return f.read()
+
+def get_save_slots(rom_hash):
+    # Straight from the index, the state files themselves are never opened
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT slot, size, saved_at FROM save_states WHERE rom_hash = ? ORDER BY slot", (rom_hash,))
+    return [dict(row) for row in cursor.fetchall()]
+
+# --- ROM INDEX LOGIC ---
+def get_rom_index():
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT * FROM rom_index")
+    return {row["path"]: dict(row) for row in cursor.fetchall()}
+
+def get_dir_index():
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT * FROM dir_index")
+    return {row["path"]: dict(row) for row in cursor.fetchall()}
+
+def update_rom_index(roms, removed_roms, dirs, removed_dirs):
+    # roms/dirs are row dicts to insert or replace, removed_* are paths. One transaction for the whole rescan
+    conn = get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO rom_index (path, folder, size, mtime_ns, rom_hash)
+            VALUES (:path, :folder, :size, :mtime_ns, :rom_hash)
+        """, roms)
+        conn.executemany("DELETE FROM rom_index WHERE path = ?", [(path,) for path in removed_roms])
+        conn.executemany("""
+            INSERT OR REPLACE INTO dir_index (path, parent, mtime_ns)
+            VALUES (:path, :parent, :mtime_ns)
+        """, dirs)
+        conn.executemany("DELETE FROM dir_index WHERE path = ?", [(path,) for path in removed_dirs])
+
+def move_rom_path(old_path, new_path):
+    # A ROM was moved/renamed (same content hash), carry its favorite and profile over
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE OR REPLACE favorites SET path = ? WHERE path = ?", (new_path, old_path))
+        conn.execute("UPDATE OR REPLACE rom_profiles SET rom_path = ? WHERE rom_path = ?", (new_path, old_path))
+
+# --- THUMBNAIL LOGIC ---
+def get_thumbnails():
+    # {rom_hash: packed 64x32 bitmap} for every cached thumbnail
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT rom_hash, bitmap FROM thumbnails")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+def save_thumbnails(thumbnails):
+    # [(rom_hash, bitmap)], one transaction per batch of finished thumbnails
+    conn = get_connection()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO thumbnails (rom_hash, bitmap) VALUES (?, ?)", thumbnails)
+
+def prune_thumbnails():
+    # Drops thumbnails of ROMs that are no longer in the library (deleted, or edited to a new hash)
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM thumbnails WHERE rom_hash NOT IN (SELECT rom_hash FROM rom_index)")
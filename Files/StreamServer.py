@@ -0,0 +1,241 @@
+import os
+import sys
+import zlib
+import struct
+import asyncio
+import argparse
+
+from Chip8_Emulator import Chip8
+from Chip8_Extended import Chip8Extended, core_for_rom
+from Scheduler import FrameScheduler, FRAME_TIME
+from BatchRunner import find_roms
+
+DEFAULT_PORT = 8765
+MAX_BUFFERED = 64 * 1024 # Bytes queued to one client before it stops getting deltas (resynced by keyframe later)
+
+#--------PROTOCOL-----------#
+# Every message is a 1-byte type and the payload length, then the payload. The display travels as
+# framebuffer_bytes() split into lines (one row of one plane, width / 8 bytes each)
+HEADER = struct.Struct(">cI")
+# Client -> server
+JOIN = b"J"     # Session name, answered with a keyframe and then deltas every frame the display changes
+KEY = b"I"      # Keypad key, pressed (1 byte each)
+LIST = b"L"     # No payload, answered with LIST: session names, one per line
+# Server -> client
+KEYFRAME = b"K" # KEYFRAME_HEAD, zlib(whole framebuffer)
+DELTA = b"D"    # DELTA_HEAD, changed line mask (bit k = line k), zlib(changed lines in order)
+ERROR = b"E"    # Message text
+
+KEYFRAME_HEAD = struct.Struct(">IHH") # frame, width, height
+DELTA_HEAD = struct.Struct(">IH")     # frame, mask length
+
+def message(kind, payload=b""):
+    return HEADER.pack(kind, len(payload)) + payload
+
+async def read_message(reader):
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, await reader.readexactly(length)
+
+def changed_lines(old, new, size):
+    mask = 0
+    for k, start in enumerate(range(0, len(new), size)):
+        if old[start:start + size] != new[start:start + size]: mask |= 1 << k
+    return mask
+
+def mask_lines(mask):
+    k = 0
+    while mask:
+        if mask & 1: yield k
+        mask >>= 1
+        k += 1
+
+#--------SESSIONS-----------#
+class Session:
+    # One headless Chip8 and the clients watching it. A frame's update is encoded once and the same bytes
+    # are written to every client, so clients cost a socket write each and not an encode
+    def __init__(self, name, path, ips):
+        self.name = name
+        self.chip8 = core_for_rom(path)
+        self.chip8.load_rom(path)
+        self.scheduler = FrameScheduler(ips)
+        self.clients = set()
+        self.frame = 0
+        self.chip8.take_dirty_rows()
+        self.framebuffer = self.chip8.framebuffer_bytes() # As last sent
+
+    def keyframe(self):
+        chip8 = self.chip8
+        return message(KEYFRAME, KEYFRAME_HEAD.pack(self.frame, chip8.width, chip8.height) + zlib.compress(self.framebuffer))
+
+    def step(self):
+        # Runs one frame, returns the message for its clients or None if the display looks the same
+        chip8 = self.chip8
+        self.scheduler.run_frame(chip8)
+        self.frame += 1
+        if not chip8.take_dirty_rows(): return None
+
+        old = self.framebuffer
+        new = self.framebuffer = chip8.framebuffer_bytes()
+        if len(old) != len(new): return self.keyframe() # Resolution changed
+        size = chip8.width // 8
+        mask = changed_lines(old, new, size)
+        if not mask: return None # Drawn over and back again within the frame
+        lines = b"".join(new[k * size:(k + 1) * size] for k in mask_lines(mask))
+        mask_bytes = mask.to_bytes((len(new) // size + 7) // 8, "big")
+        return message(DELTA, DELTA_HEAD.pack(self.frame, len(mask_bytes)) + mask_bytes + zlib.compress(lines))
+
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.session = None
+        self.stale = True # Missed updates (or never had any), gets a keyframe at the next chance
+
+#--------SERVER-----------#
+class StreamServer:
+    # Runs every session on one 60 Hz tick in the event loop and streams display updates to the clients
+    # joined to each. Input from a client goes straight to its session's keypad between ticks, so there
+    # is nothing to lock. A client that can't keep up is skipped rather than queued for, then resynced
+    def __init__(self, sessions):
+        self.sessions = {session.name: session for session in sessions}
+        self.dropped = 0 # Updates skipped for slow clients
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Streaming {len(self.sessions)} session(s) on {host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.tick())
+
+    async def tick(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            for session in self.sessions.values():
+                update = session.step()
+                for client in session.clients:
+                    if update or client.stale: self.send(client, update)
+
+            deadline += FRAME_TIME
+            delay = deadline - loop.time()
+            if delay < 0: # Behind, drop the backlog like the scheduler's catch-up limit
+                deadline = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def send(self, client, update):
+        if client.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            if update: self.dropped += 1
+            client.stale = True
+            return
+        if client.stale:
+            update = client.session.keyframe() # Covers everything it missed
+            client.stale = False
+        client.writer.write(update)
+
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == JOIN:
+                    session = self.sessions.get(payload.decode(errors="replace"))
+                    if session is None:
+                        writer.write(message(ERROR, b"No such session"))
+                        continue
+                    if client.session: client.session.clients.discard(client)
+                    client.session = session
+                    client.stale = True
+                    session.clients.add(client)
+                    self.send(client, None)
+                elif kind == KEY and client.session and len(payload) == 2:
+                    client.session.chip8.set_key(payload[0] & 0xF, payload[1])
+                elif kind == LIST:
+                    writer.write(message(LIST, "\n".join(self.sessions).encode()))
+                else:
+                    writer.write(message(ERROR, b"Bad message"))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError): # Gone, or server stopping
+            pass
+        finally:
+            if client.session: client.session.clients.discard(client)
+            writer.close()
+
+#--------CLIENT-----------#
+class StreamClient:
+    # Follows one session and keeps view (a Chip8 of the right kind) showing its display, dirty rows and
+    # all, so it can be drawn like a local game. For spectators and bots
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.view = None
+        self.framebuffer = None
+        self.frame = 0
+
+    @classmethod
+    async def connect(cls, session, host="127.0.0.1", port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(message(JOIN, session.encode()))
+        return cls(reader, writer)
+
+    async def press(self, key, pressed=True):
+        self.writer.write(message(KEY, bytes((key, 1 if pressed else 0))))
+        await self.writer.drain()
+
+    async def update(self):
+        # Applies the next message from the server, returns its frame number
+        kind, payload = await read_message(self.reader)
+        if kind == KEYFRAME:
+            self.frame, width, height = KEYFRAME_HEAD.unpack_from(payload)
+            self.framebuffer = bytearray(zlib.decompress(payload[KEYFRAME_HEAD.size:]))
+            if self.view is None:
+                self.view = Chip8() if len(self.framebuffer) == 256 else Chip8Extended()
+        elif kind == DELTA:
+            self.frame, length = DELTA_HEAD.unpack_from(payload)
+            start = DELTA_HEAD.size
+            mask = int.from_bytes(payload[start:start + length], "big")
+            lines = zlib.decompress(payload[start + length:])
+            size = self.view.width // 8
+            for index, k in enumerate(mask_lines(mask)):
+                self.framebuffer[k * size:(k + 1) * size] = lines[index * size:(index + 1) * size]
+        elif kind == ERROR:
+            raise ConnectionError(payload.decode(errors="replace"))
+        else:
+            return self.frame
+        self.view.dirty_rows |= self.view.load_framebuffer(bytes(self.framebuffer))
+        return self.frame
+
+    def close(self):
+        self.writer.close()
+
+#--------CLI-----------#
+def build_sessions(paths, copies=1, ips=700):
+    # Sessions are named after their ROM file, numbered when there are several of one
+    sessions = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        for copy in range(1, copies + 1):
+            sessions.append(Session(name if copies == 1 else f"{name}-{copy}", path, ips))
+    return sessions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run CHIP-8 sessions headless and stream their displays over TCP.")
+    parser.add_argument("targets", nargs="*", default=["ROMS"], help="ROM files or folders (default: ROMS)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--ips", type=int, default=700, help="Instructions per second per session (default: 700)")
+    parser.add_argument("--copies", type=int, default=1, help="Sessions to run per ROM (default: 1)")
+    args = parser.parse_args(argv)
+
+    roms = find_roms(args.targets)
+    if not roms:
+        print("No ROMs found")
+        return 1
+
+    server = StreamServer(build_sessions(roms, args.copies, args.ips))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Server stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from Chip8_Extended import core_for_rom
+from Scheduler import FrameScheduler
+import SettingsManager as sm
+
+THUMBNAIL_FRAMES = 300 # Frames run with no input before the display is kept (5 s, past most title fade-ins)
+THUMBNAIL_IPS = 700
+POLL_MS = 100 # How often the Tk thread hands queued ROMs to the pool and collects finished thumbnails
+# Workers come from a single-threaded fork server where there is one, never forked straight from the app once
+# pygame, the mixer or the core thread are running. Windows (and macOS) spawn fresh processes anyway
+POOL_CONTEXT = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+
+# Byte of a 128 pixel row -> its 4 pixel pairs as 4 bits, a pair lit if either pixel is (halves hires width)
+PAIR_OR = bytes(sum(1 << k for k in range(4) if (byte >> 2 * k) & 3) for byte in range(256))
+
+#--------RENDERING (pool workers)-----------#
+def thumbnail_bitmap(chip8_instance):
+    # The display packed like Chip8.framebuffer_bytes (64x32, 256 bytes) whatever the core: XO-CHIP planes
+    # are merged and hires is halved both ways, a pixel lit if any pixel it covers is
+    width, height = chip8_instance.width, chip8_instance.height
+    data = chip8_instance.framebuffer_bytes()
+    size = width // 8
+    rows = [0] * height
+    for offset in range(0, len(data), size * height):
+        for y in range(height):
+            rows[y] |= int.from_bytes(data[offset + y * size:offset + (y + 1) * size], "big")
+    if width == 64: return b"".join(row.to_bytes(8, "big") for row in rows)
+
+    bitmap = bytearray()
+    for y in range(0, height, 2):
+        row = (rows[y] | rows[y + 1]).to_bytes(16, "big")
+        bitmap += bytes(PAIR_OR[row[k]] << 4 | PAIR_OR[row[k + 1]] for k in range(0, 16, 2))
+    return bytes(bitmap)
+
+def render_thumbnail(path, frames=THUMBNAIL_FRAMES, ips=THUMBNAIL_IPS):
+    # Runs the ROM headless like BatchRunner.run_rom, a ROM that crashes keeps whatever it had drawn
+    chip8 = core_for_rom(path)
+    scheduler = FrameScheduler(ips)
+    try:
+        chip8.load_rom(path)
+        for _ in range(frames):
+            scheduler.run_frame(chip8)
+    except Exception:
+        pass
+    return thumbnail_bitmap(chip8)
+
+#--------CACHE-----------#
+class ThumbnailCache:
+    # Thumbnails for the library window, by ROM content hash. Cached ones come straight from settings.db,
+    # missing ones are rendered on a process pool in the background. Both the pool hand-off and the
+    # results go through poll() on the Tk thread (sqlite and Tk both stay on it), which passes each
+    # batch of new thumbnails to on_ready({rom_hash: bitmap}). The pool is shut down once idle
+    def __init__(self, root, on_ready, workers=None):
+        self.root = root
+        self.on_ready = on_ready
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1) # A core left over for a game started meanwhile
+        self.bitmaps = None   # rom_hash -> bitmap, read from the database on the first request
+        self.queued = {}      # rom_hash -> path, waiting for the next poll
+        self.pending = set()  # Hashes on the pool
+        self.done = deque()   # (rom_hash, future), appended by the pool's callback thread
+        self.pool = None
+        self.polling = False
+
+    def request(self, roms):
+        # roms are scan_library rows. Returns the cached {rom_hash: bitmap}, the rest are rendered
+        if self.bitmaps is None:
+            sm.prune_thumbnails()
+            self.bitmaps = sm.get_thumbnails()
+        for row in roms:
+            rom_hash = row["rom_hash"]
+            if rom_hash not in self.bitmaps and rom_hash not in self.pending: self.queued[rom_hash] = row["path"]
+        if self.queued and not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.poll) # Not from here, so the library window opens first
+        return dict(self.bitmaps)
+
+    def poll(self):
+        if self.queued:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(POOL_CONTEXT))
+            for rom_hash, path in self.queued.items():
+                self.pending.add(rom_hash)
+                future = self.pool.submit(render_thumbnail, path)
+                future.add_done_callback(lambda future, rom_hash=rom_hash: self.done.append((rom_hash, future)))
+            self.queued.clear()
+
+        finished = []
+        while self.done:
+            rom_hash, future = self.done.popleft()
+            self.pending.discard(rom_hash)
+            if future.cancelled() or future.exception(): continue # Tried again on the next request
+            finished.append((rom_hash, future.result()))
+        if finished:
+            sm.save_thumbnails(finished)
+            self.bitmaps.update(finished)
+            self.on_ready(dict(finished))
+
+        if self.pending:
+            self.root.after(POLL_MS, self.poll)
+        else:
+            self.polling = False
+            self.stop()
+
+    def stop(self):
+        if self.pool: self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None